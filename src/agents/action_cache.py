@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import pathlib
+import typing
+
+# Directory for the persistent action cache. Re-running the workflow with
+# identical inputs (plan, file contents, ...) would otherwise recompute the
+# exact same LLM outputs on every retry.
+CACHE_DIR = pathlib.Path(os.environ.get("CODESYNTH_CACHE_DIR", ".codesynth_cache"))
+
+# Opt-out switch: set CODESYNTH_DISABLE_CACHE=1 to always re-run sub-agents.
+CACHE_DISABLED = os.environ.get("CODESYNTH_DISABLE_CACHE") == "1"
+
+
+def compute_action_key(agent_name: str, state_slice: typing.Dict[str, typing.Any]) -> str:
+    """
+    Computes a stable cache key for one sub-agent invocation.
+
+    Args:
+        agent_name: The name of the sub-agent being invoked.
+        state_slice: The subset of session state the sub-agent's output
+                     depends on (include file hashes for file-dependent
+                     agents so edits invalidate the entry).
+
+    Returns:
+        A hex SHA-256 digest usable as a cache filename.
+    """
+    payload = json.dumps(
+        {"agent": agent_name, "state_slice": state_slice},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def hash_files(base_path_str: typing.Optional[str], rel_paths: typing.List[str]) -> typing.Dict[str, typing.Optional[str]]:
+    """
+    Hashes the contents of the given files so the cache key changes whenever
+    any file does. Missing/unreadable files hash to None (still part of the
+    key, so their absence is cached consistently too).
+    """
+    digests: typing.Dict[str, typing.Optional[str]] = {}
+    base_dir = pathlib.Path(base_path_str) if base_path_str else pathlib.Path(".")
+    for rel_path in rel_paths:
+        try:
+            digests[rel_path] = hashlib.sha256((base_dir / rel_path).read_bytes()).hexdigest()
+        except OSError:
+            digests[rel_path] = None
+    return digests
+
+
+# Checkpoint file for the session state, written between workflow steps so a
+# crashed run can be resumed (seed the next run's initial state from it; the
+# orchestrator skips steps whose outputs are already present).
+STATE_CHECKPOINT_PATH = CACHE_DIR / "session_state.json"
+
+
+def checkpoint_state(state: typing.Mapping[str, typing.Any]) -> None:
+    """Persists a JSON snapshot of the session state; failures are non-fatal."""
+    if CACHE_DISABLED:
+        return
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(STATE_CHECKPOINT_PATH, "w", encoding="utf-8") as f:
+            json.dump(dict(state), f, default=str)
+    except OSError as e:
+        print(f"Warning: Could not checkpoint session state: {e}")
+
+
+def load_cached_output(key: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """Returns the cached output dict for the key, or None on miss/corruption."""
+    if CACHE_DISABLED:
+        return None
+    entry_path = CACHE_DIR / f"{key}.json"
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def store_cached_output(key: str, output: typing.Dict[str, typing.Any]) -> None:
+    """Stores the output dict for the key; failures are non-fatal."""
+    if CACHE_DISABLED:
+        return
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        entry_path = CACHE_DIR / f"{key}.json"
+        with open(entry_path, "w", encoding="utf-8") as f:
+            json.dump(output, f, default=str)
+    except OSError as e:
+        print(f"Warning: Could not write action cache entry {key}: {e}")
@@ -0,0 +1,45 @@
+import os
+from google.adk.agents import LlmAgent
+
+from .instruction_caching import build_instruction_kwargs
+
+# Define the combined Analysis + Planning Agent.
+# Requirement analysis and implementation planning are two back-to-back LLM
+# round-trips with no tool call in between, so both steps can be served by a
+# single call that emits one JSON object with both outputs. The orchestrator
+# splits the object back into the 'requirement_details' and
+# 'implementation_plan' state keys that downstream agents expect.
+analyze_and_plan_agent = LlmAgent(
+    name="analyze_and_plan",
+    model=os.getenv("ADK_LLM_MODEL", "gemini-2.5-flash"), # Use env var or default
+    **build_instruction_kwargs(
+        "Your task is to analyze the user's software requirement AND produce a "
+        "detailed implementation plan in a single response.\n"
+        "Part 1 - Requirement Analysis:\n"
+        "1. Read the requirement provided in the initial session state under the key 'user_requirement'.\n"
+        "2. Understand the core goal, identify ambiguities, missing information, or conflicts.\n"
+        "3. Decompose the requirement into a clear, structured list of specific features, "
+        "user stories, or actionable steps. List any ambiguities clearly.\n"
+        "Part 2 - Implementation Planning:\n"
+        "4. Review the code context summary provided in session state under the key 'code_context'. "
+        "If no context was provided, assume a new implementation.\n"
+        "5. Using your own analysis from Part 1, generate a clear, actionable plan outlining:\n"
+        "    - New files to be created (with paths relative to the project root).\n"
+        "    - New functions or classes to be implemented (with signatures and brief descriptions).\n"
+        "    - Existing files/functions/classes to be modified (specify changes needed).\n"
+        "    - Core logic flow for the implementation.\n"
+        "    - Any necessary data structures or interfaces.\n"
+        "6. The plan should be detailed enough for another agent (Code Generation Agent) to directly implement the code.\n"
+        "Output format: Respond with ONLY a single JSON object of the form:\n"
+        '{"requirement_details": "<the structured analysis from Part 1>", '
+        '"implementation_plan": "<the step-by-step plan from Part 2>"}\n'
+        "Do not wrap the JSON in markdown fences or add any other text."
+    ),
+    tools=[], # No tools needed; both steps are pure LLM reasoning
+    output_key="analysis_and_plan" # The orchestrator splits this into the two legacy keys
+)
+
+# Example usage/testing can be added below if needed
+# if __name__ == '__main__':
+#    # Add code here to test the agent directly
+#    pass
@@ -1,11 +1,13 @@
 import os
 from google.adk.agents import LlmAgent
 
+from .instruction_caching import build_instruction_kwargs
+
 # Define the Implementation Planning Agent
 implementation_planner_agent = LlmAgent(
     name="implementation_planner",
     model=os.getenv("ADK_LLM_MODEL", "gemini-2.5-flash"), # Use env var or default
-    instruction=(
+    **build_instruction_kwargs(
         "Your task is to create a detailed, step-by-step implementation plan based on the "
         "software requirement analysis and the existing code context.\n"
         "1. Review the structured requirement details provided in session state under the key 'requirement_details'.\n"
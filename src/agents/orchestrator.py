@@ -1,3 +1,7 @@
+import asyncio
+import hashlib
+import json
+import logging
 import os
 from typing import AsyncGenerator
 
@@ -5,11 +9,29 @@ from google.adk.agents import BaseAgent
 from google.adk.sessions import InvocationContext
 from google.adk.events import Event
 
+logger = logging.getLogger(__name__)
+
+
+def _log_state_preview(state, key: str) -> None:
+    """
+    Logs a truncated preview of a session-state value at DEBUG level.
+    Values like 'code_context' can hold entire file contents, so the full
+    repr is only built when DEBUG logging is actually enabled, and even
+    then only a 200-char head is emitted.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        value = str(state.get(key))
+        logger.debug("State[%r] size=%d head=%s", key, len(value), value[:200])
+
+
 # Import sub-agent instances
 # Ensure these files exist and the agent instances are correctly defined within them.
 from .requirement_analysis import requirement_analyzer_agent
 from .code_exploration import code_explorer_agent
 from .implementation_planning import implementation_planner_agent
+from .analysis_planning import analyze_and_plan_agent
+from .action_cache import checkpoint_state, compute_action_key, hash_files, load_cached_output, store_cached_output
+from .request_coalescing import install_request_coalescing
 from .code_generation import code_generator_agent
 from .code_review import code_reviewer_agent
 # from .testing import tester_agent # Commented out
@@ -23,6 +45,12 @@ from google.adk.agents import LlmAgent # Use LlmAgent as a placeholder type
 # Configuration for the refactor loop
 MAX_REFACTOR_ATTEMPTS = int(os.environ.get("MAX_REFACTOR_ATTEMPTS", 2)) # Default to 2 attempts
 
+# Feature flag: when enabled (default), requirement analysis and implementation
+# planning are fused into one LLM call whenever code exploration is skipped,
+# saving a full LLM round-trip. Set FUSE_ANALYSIS_PLANNING=0 to fall back to
+# the original two sequential agents (useful for A/B comparison).
+FUSE_ANALYSIS_PLANNING = os.environ.get("FUSE_ANALYSIS_PLANNING", "1") == "1"
+
 class RequirementImplementationOrchestrator(BaseAgent):
     """
     Orchestrates the end-to-end workflow for implementing a software requirement
@@ -34,17 +62,34 @@ class RequirementImplementationOrchestrator(BaseAgent):
         self.req_analysis_agent = requirement_analyzer_agent
         self.code_explore_agent = code_explorer_agent
         self.plan_agent = implementation_planner_agent
+        self.analyze_and_plan_agent = analyze_and_plan_agent # Fused analysis + planning
         self.code_gen_agent = code_generator_agent
         self.code_review_agent = code_reviewer_agent
         # self.test_agent = tester_agent # Commented out
         self.refactor_agent = refactorer_agent
         self.versioner_agent = versioner_agent # Instantiate the new agent
 
+        # Coalesce byte-identical concurrent LLM requests (parallel branches,
+        # concurrently running workflows) onto a single provider call.
+        for sub_agent in (
+            self.req_analysis_agent,
+            self.code_explore_agent,
+            self.plan_agent,
+            self.analyze_and_plan_agent,
+            self.code_gen_agent,
+            self.code_review_agent,
+            self.refactor_agent,
+            self.versioner_agent,
+        ):
+            install_request_coalescing(sub_agent)
+
         # Register sub-agents with the framework for proper event handling etc.
         super().__init__(sub_agents=[
             self.req_analysis_agent,
             self.code_explore_agent,
             self.plan_agent,
+            self.analyze_and_plan_agent, # Fused analysis + planning
+
             self.code_gen_agent,
             self.code_review_agent,
             # self.test_agent, # Commented out
@@ -52,75 +97,264 @@ class RequirementImplementationOrchestrator(BaseAgent):
             self.versioner_agent # Register the new agent
         ], name="requirement_implementation_orchestrator")
 
+    @staticmethod
+    def _split_analysis_and_plan(ctx: InvocationContext) -> None:
+        """
+        Splits the fused agent's JSON output into the 'requirement_details'
+        and 'implementation_plan' state keys that downstream agents expect.
+        Falls back to storing the raw output under both keys if parsing fails.
+        """
+        raw_output = ctx.session.state.get("analysis_and_plan")
+        parsed = None
+        if isinstance(raw_output, dict):
+            parsed = raw_output
+        elif isinstance(raw_output, str):
+            text = raw_output.strip()
+            # Tolerate markdown fences despite the instruction forbidding them
+            if text.startswith("```"):
+                text = text.strip("`")
+                if text.startswith("json"):
+                    text = text[len("json"):]
+            try:
+                parsed = json.loads(text)
+            except (json.JSONDecodeError, ValueError):
+                parsed = None
+
+        if isinstance(parsed, dict) and "requirement_details" in parsed and "implementation_plan" in parsed:
+            ctx.session.state["requirement_details"] = parsed["requirement_details"]
+            ctx.session.state["implementation_plan"] = parsed["implementation_plan"]
+        else:
+            logger.warning("Could not parse fused analysis/plan output as JSON; storing raw output under both keys.")
+            ctx.session.state["requirement_details"] = raw_output
+            ctx.session.state["implementation_plan"] = raw_output
+
+    @staticmethod
+    def _needs_run(session_state, *output_keys: str) -> bool:
+        """
+        Returns True when a sub-agent still has to run: at least one of its
+        output keys is missing from the session state, or the caller asked
+        for a full re-run via state['force_rerun']. Lets a resumed/retried
+        workflow skip steps whose (expensive) LLM outputs already exist.
+        """
+        if session_state.get("force_rerun"):
+            return True
+        return not all(session_state.get(key) for key in output_keys)
+
+    @staticmethod
+    def _generated_files_digest(ctx: InvocationContext) -> str:
+        """
+        Returns a single digest over the contents of all generated files.
+        The refactor loop compares the digest across attempts to detect a
+        no-progress iteration (the refactorer produced identical output),
+        in which case re-running tests and refactoring again is pointless.
+        """
+        generated = ctx.session.state.get("generated_code_paths") or []
+        if not isinstance(generated, (list, tuple)):
+            generated = [str(generated)]
+        base_path = ctx.session.state.get("project_path", ctx.session.state.get("codebase_path"))
+        file_hashes = hash_files(base_path, sorted(generated))
+        return hashlib.sha256(json.dumps(file_hashes, sort_keys=True).encode("utf-8")).hexdigest()
+
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """
         Implements the custom logic for the requirement implementation workflow.
         """
-        print("\n--- Starting Requirement Analysis ---")
-        async for event in self.req_analysis_agent.run_async(ctx):
-            yield event
-        print("--- Requirement Analysis Done ---")
-        print(f"State['requirement_details']: {ctx.session.state.get('requirement_details')}")
-
-        # Check if codebase exploration is needed
-        # Use a placeholder key for now, adjust as needed based on initial input
-        if ctx.session.state.get("initial_codebase_path"):
-            print("\n--- Starting Code Exploration ---")
-            # Pass the path to the explorer agent, potentially via state or context modification if needed
-            # ctx.session.state["codebase_path"] = ctx.session.state.get("initial_codebase_path") # Example
-            async for event in self.code_explore_agent.run_async(ctx):
-                yield event
-            print("--- Code Exploration Done ---")
-            print(f"State['code_context']: {ctx.session.state.get('code_context')}")
-        else:
-            print("\n--- Skipping Code Exploration (no initial_codebase_path provided in session state) ---")
+        # Hoist the state mapping into a local: the body below touches it on
+        # every step and a LOAD_FAST is far cheaper than re-walking the
+        # ctx.session.state attribute chain each time.
+        session_state = ctx.session.state
+
+        # When no codebase exploration is needed there is no tool call between
+        # requirement analysis and implementation planning, so both steps can
+        # be fused into a single LLM round-trip. With exploration in between,
+        # the original sequential agents are kept (the plan needs the explored
+        # code context).
+        use_fused_analysis = FUSE_ANALYSIS_PLANNING and not session_state.get("initial_codebase_path")
+
+        if use_fused_analysis:
+            logger.info("--- Skipping Code Exploration (no initial_codebase_path provided in session state) ---")
             # Set a default context if exploration is skipped
-            ctx.session.state["code_context"] = "No existing codebase provided or explored."
-
-        print("\n--- Starting Implementation Planning ---")
-        async for event in self.plan_agent.run_async(ctx):
-            yield event
-        print("--- Implementation Planning Done ---")
-        print(f"State['implementation_plan']: {ctx.session.state.get('implementation_plan')}")
-
-        print("\n--- Starting Code Generation ---")
-        async for event in self.code_gen_agent.run_async(ctx):
-            yield event
-        print("--- Code Generation Done ---")
-        generated_paths = ctx.session.state.get('generated_code_paths') # Get paths for check
-        print(f"State['generated_code_paths']: {generated_paths}")
-
-        # Add the Code Review Step here
-        if generated_paths: # Only run review if code was generated
-            print("\n--- Starting Code Review ---")
-            async for event in self.code_review_agent.run_async(ctx):
+            session_state["code_context"] = "No existing codebase provided or explored."
+
+            if self._needs_run(session_state, "requirement_details", "implementation_plan"):
+                logger.info("--- Starting Combined Requirement Analysis + Implementation Planning ---")
+                async for event in self.analyze_and_plan_agent.run_async(ctx):
+                    yield event
+                self._split_analysis_and_plan(ctx)
+                logger.info("--- Combined Requirement Analysis + Implementation Planning Done ---")
+            else:
+                logger.info("--- Skipping Requirement Analysis + Planning: outputs already present in session state. ---")
+            _log_state_preview(session_state, 'requirement_details')
+            _log_state_preview(session_state, 'implementation_plan')
+        else:
+            if self._needs_run(session_state, "requirement_details"):
+                logger.info("--- Starting Requirement Analysis ---")
+                async for event in self.req_analysis_agent.run_async(ctx):
+                    yield event
+                logger.info("--- Requirement Analysis Done ---")
+            else:
+                logger.info("--- Skipping Requirement Analysis: 'requirement_details' already present in session state. ---")
+            _log_state_preview(session_state, 'requirement_details')
+
+            # Check if codebase exploration is needed
+            # Use a placeholder key for now, adjust as needed based on initial input
+            if session_state.get("initial_codebase_path"):
+                if self._needs_run(session_state, "code_context"):
+                    logger.info("--- Starting Code Exploration ---")
+                    # Pass the path to the explorer agent, potentially via state or context modification if needed
+                    # session_state["codebase_path"] = session_state.get("initial_codebase_path") # Example
+                    async for event in self.code_explore_agent.run_async(ctx):
+                        yield event
+                    logger.info("--- Code Exploration Done ---")
+                else:
+                    logger.info("--- Skipping Code Exploration: 'code_context' already present in session state. ---")
+                _log_state_preview(session_state, 'code_context')
+            else:
+                logger.info("--- Skipping Code Exploration (no initial_codebase_path provided in session state) ---")
+                # Set a default context if exploration is skipped
+                session_state["code_context"] = "No existing codebase provided or explored."
+
+            if self._needs_run(session_state, "implementation_plan"):
+                logger.info("--- Starting Implementation Planning ---")
+                async for event in self.plan_agent.run_async(ctx):
+                    yield event
+                logger.info("--- Implementation Planning Done ---")
+            else:
+                logger.info("--- Skipping Implementation Planning: 'implementation_plan' already present in session state. ---")
+            _log_state_preview(session_state, 'implementation_plan')
+
+        # Checkpoint after the analysis/planning phase so a crash below can
+        # resume without re-running those LLM calls.
+        checkpoint_state(session_state)
+
+        if self._needs_run(session_state, "generated_code_paths"):
+            logger.info("--- Starting Code Generation ---")
+            async for event in self.code_gen_agent.run_async(ctx):
                 yield event
-            print("--- Code Review Done ---")
-            print(f"State['code_review_summary']: {ctx.session.state.get('code_review_summary')}")
+            logger.info("--- Code Generation Done ---")
         else:
-             print("\n--- Skipping Code Review: No generated code paths found. ---")
+            logger.info("--- Skipping Code Generation: 'generated_code_paths' already present in session state. ---")
+        generated_paths = session_state.get('generated_code_paths') # Get paths for check
+        _log_state_preview(session_state, 'generated_code_paths')
+        checkpoint_state(session_state)
 
-        # Add Versioning Step here
+        # Code Review and Versioning run as parallel branches.
+        # Versioning only depends on 'generated_code_paths' and 'project_path',
+        # not on the review summary, so both sub-agents can be dispatched
+        # concurrently and their LLM/tool round-trips overlap.
         # Check for project_path which is needed by the git tools as base_path_str
         # The versioner agent expects 'project_path' in the state. Let's ensure it's there.
         # We'll use 'codebase_path' if 'project_path' isn't explicitly set elsewhere.
-        project_path_for_git = ctx.session.state.get("project_path", ctx.session.state.get("codebase_path"))
+        project_path_for_git = session_state.get("project_path", session_state.get("codebase_path"))
+
+        run_review = bool(generated_paths) and self._needs_run(session_state, "code_review_summary")
+        run_versioning = bool(generated_paths and project_path_for_git) and self._needs_run(session_state, "versioning_summary")
+        if generated_paths and not self._needs_run(session_state, "code_review_summary"):
+            logger.info("--- Skipping Code Review: 'code_review_summary' already present in session state. ---")
+        if generated_paths and project_path_for_git and not self._needs_run(session_state, "versioning_summary"):
+            logger.info("--- Skipping Versioning: 'versioning_summary' already present in session state. ---")
 
-        if generated_paths and project_path_for_git: # Only run if code was generated AND project path exists
+        # Action cache: when the implementation plan and the generated files
+        # are identical to a previously reviewed run (e.g. a retried
+        # workflow), serve the review summary from disk and skip the LLM call.
+        review_cache_key = None
+        if run_review:
+            paths_for_hashing = list(generated_paths) if isinstance(generated_paths, (list, tuple)) else [str(generated_paths)]
+            review_cache_key = compute_action_key(
+                self.code_review_agent.name,
+                {
+                    "implementation_plan": session_state.get("implementation_plan"),
+                    "generated_code_paths": generated_paths,
+                    "file_hashes": hash_files(project_path_for_git, paths_for_hashing),
+                },
+            )
+            cached_review = load_cached_output(review_cache_key)
+            if cached_review is not None and "code_review_summary" in cached_review:
+                session_state["code_review_summary"] = cached_review["code_review_summary"]
+                logger.info("--- Code Review: served from action cache (inputs unchanged since last run) ---")
+                _log_state_preview(session_state, 'code_review_summary')
+                run_review = False
+                review_cache_key = None
+
+        if not generated_paths:
+             logger.info("--- Skipping Code Review: No generated code paths found. ---")
+        if not generated_paths:
+             logger.info("--- Skipping Versioning: No generated code paths found. ---")
+        elif not project_path_for_git:
+             logger.info("--- Skipping Versioning: Project path ('project_path' or 'codebase_path') not found in session state. Searched for: %s ---", project_path_for_git)
+
+        if run_versioning and "project_path" not in session_state:
             # Ensure project_path is explicitly in the state for the versioner agent
-            if "project_path" not in ctx.session.state and project_path_for_git:
-                 ctx.session.state["project_path"] = project_path_for_git
-                 print(f"Added 'project_path': {project_path_for_git} to session state for versioning.")
+            session_state["project_path"] = project_path_for_git
+            logger.info("Added 'project_path': %s to session state for versioning.", project_path_for_git)
 
-            print("\n--- Starting Versioning ---")
-            async for event in self.versioner_agent.run_async(ctx):
-                yield event
-            print("--- Versioning Done ---")
-            print(f"State['versioning_summary']: {ctx.session.state.get('versioning_summary')}")
-        elif not generated_paths:
-             print("\n--- Skipping Versioning: No generated code paths found. ---")
-        else: # Implies project_path is missing
-             print(f"\n--- Skipping Versioning: Project path ('project_path' or 'codebase_path') not found in session state. Searched for: {project_path_for_git} ---")
+        if run_review or run_versioning:
+            logger.info("--- Starting Code Review / Versioning (parallel) ---")
+
+            # Both branches run against the live session state; their outputs
+            # land under distinct keys ('code_review_summary' /
+            # 'versioning_summary'), so no post-hoc merge is needed.
+
+            async def _drain(agent: BaseAgent, queue: asyncio.Queue) -> None:
+                """Drains one sub-agent's event stream into its branch queue."""
+                try:
+                    async for event in agent.run_async(ctx):
+                        await queue.put(event)
+                finally:
+                    await queue.put(None)  # Sentinel: this branch is done.
+
+            branch_queues: list[asyncio.Queue] = []
+            branch_tasks: list[asyncio.Task] = []
+            if run_review:
+                review_queue: asyncio.Queue = asyncio.Queue()
+                branch_queues.append(review_queue)
+                branch_tasks.append(asyncio.create_task(_drain(self.code_review_agent, review_queue)))
+            if run_versioning:
+                version_queue: asyncio.Queue = asyncio.Queue()
+                branch_queues.append(version_queue)
+                branch_tasks.append(asyncio.create_task(_drain(self.versioner_agent, version_queue)))
+
+            # Merge loop: yield from whichever branch has events ready, until
+            # every branch has delivered its sentinel. After an await completes,
+            # every already-queued event is drained with get_nowait so chatty
+            # streaming agents don't pay one Task + await cycle per event.
+            getters = {queue: asyncio.create_task(queue.get()) for queue in branch_queues}
+            while getters:
+                done, _ = await asyncio.wait(getters.values(), return_when=asyncio.FIRST_COMPLETED)
+                for queue in list(getters):
+                    getter = getters[queue]
+                    if getter not in done:
+                        continue
+                    item = getter.result()
+                    # Batch-drain: pull everything already buffered on this
+                    # branch before re-arming its awaiting getter.
+                    branch_done = False
+                    while True:
+                        if item is None:
+                            branch_done = True
+                            break
+                        yield item
+                        try:
+                            item = queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            break
+                    if branch_done:
+                        del getters[queue]
+                    else:
+                        getters[queue] = asyncio.create_task(queue.get())
+
+            # Propagate any exceptions raised inside the branches.
+            await asyncio.gather(*branch_tasks)
+
+            # Persist the fresh review so identical future runs can skip it.
+            if run_review and review_cache_key:
+                store_cached_output(review_cache_key, {"code_review_summary": session_state.get("code_review_summary")})
+
+            logger.info("--- Code Review / Versioning Done ---")
+            if run_review:
+                _log_state_preview(session_state, 'code_review_summary')
+            if run_versioning:
+                _log_state_preview(session_state, 'versioning_summary')
 
 
         # Ensure generated_code_paths exists before testing (Keep commented out block)
@@ -132,12 +366,15 @@ class RequirementImplementationOrchestrator(BaseAgent):
         # # print("\n--- Starting Testing ---")
         # # # async for event in self.test_agent.run_async(ctx):
         # #     yield event
-        # # test_results = ctx.session.state.get("test_results", {})
+        # # test_results = session_state.get("test_results", {})
         # # print("--- Testing Done ---")
         # # print(f"State['test_results']: {test_results}")
 
         # # --- Iterative Refactor/Test Loop ---
         # attempt = 0
+        # # Digest of the generated files before the first attempt, used for
+        # # convergence detection across iterations.
+        # prev_digest = self._generated_files_digest(ctx)
         # # Check if 'status' key exists and if it's not 'PASS'
         # # Handle potential case differences and ensure status exists
         # while test_results.get("status", "UNKNOWN").upper() != "PASS" and attempt < MAX_REFACTOR_ATTEMPTS:
@@ -147,12 +384,21 @@ class RequirementImplementationOrchestrator(BaseAgent):
         #         yield event
         #     print(f"--- Refactoring Attempt {attempt} Done ---")
         #     # Assuming refactor agent updates files in place or updates 'generated_code_paths'
-        #     print(f"State['generated_code_paths' after refactor]: {ctx.session.state.get('generated_code_paths')}")
+        #     print(f"State['generated_code_paths' after refactor]: {session_state.get('generated_code_paths')}")
+        #
+        #     # Convergence check: if this attempt left every generated file
+        #     # byte-identical to the previous attempt, another test+refactor
+        #     # round-trip cannot make progress - abort the loop early.
+        #     digest = self._generated_files_digest(ctx)
+        #     if digest == prev_digest:
+        #         print(f"--- Refactoring Attempt {attempt} produced no changes (digest unchanged); aborting loop early ---")
+        #         break
+        #     prev_digest = digest
         #
         #     print(f"\n--- Re-running Tests after Refactoring Attempt {attempt} ---")
         #     async for event in self.test_agent.run_async(ctx): # Re-run tests
         #         yield event
-        #     test_results = ctx.session.state.get("test_results", {}) # Update results
+        #     test_results = session_state.get("test_results", {}) # Update results
         #     print(f"--- Re-Testing Done (Attempt {attempt}) ---")
         #     print(f"State['test_results']: {test_results}")
 
@@ -162,7 +408,9 @@ class RequirementImplementationOrchestrator(BaseAgent):
         # else:
         #     print("\n--- Tests Passed! ---")
 
-        print("\n--- Workflow Complete ---")
+        checkpoint_state(session_state)
+
+        logger.info("--- Workflow Complete ---")
 
 # Instantiate the orchestrator agent.
 # This instance will be imported by the main execution script or runner setup.
@@ -0,0 +1,48 @@
+import json
+import typing
+
+# The generator/refactorer LLMs emit their path lists in whatever order they
+# like. Downstream prompt and action caches key on byte-identical inputs, so
+# the same set of paths in a different order would destroy every cache hit.
+# These callbacks rewrite the state value into one canonical form:
+# deduplicated, './'-prefix stripped, stably sorted.
+
+
+def _canonicalize(paths: typing.Any) -> typing.Optional[typing.List[str]]:
+    """Returns the canonical sorted path list, or None if the value isn't a recognizable path list."""
+    if isinstance(paths, str):
+        text = paths.strip()
+        # Tolerate a JSON array in markdown fences
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.startswith("json"):
+                text = text[len("json"):]
+        try:
+            paths = json.loads(text)
+        except (json.JSONDecodeError, ValueError):
+            return None
+    if not isinstance(paths, (list, tuple)):
+        return None
+    cleaned = set()
+    for path in paths:
+        normalized = str(path).strip()
+        if normalized.startswith("./"):
+            normalized = normalized[2:]
+        if normalized:
+            cleaned.add(normalized)
+    return sorted(cleaned)
+
+
+def make_path_canonicalizer(state_key: str):
+    """
+    Builds an after_agent_callback that canonicalizes the path list stored
+    under the given session-state key (e.g. 'generated_code_paths').
+    """
+    def canonicalize_paths(callback_context) -> None:
+        raw = callback_context.state.get(state_key)
+        canonical = _canonicalize(raw)
+        if canonical is not None:
+            callback_context.state[state_key] = canonical
+        return None
+
+    return canonicalize_paths
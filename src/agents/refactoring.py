@@ -1,13 +1,17 @@
 import os
 from google.adk.agents import LlmAgent
+
+from .instruction_caching import build_instruction_kwargs
 # Import necessary tools
-from src.custom_tools import read_file, write_file, run_tests # Ensure these imports are present
+from src.custom_tools import TEST_TOOLS # Ensure this import is present
+
+from .path_canonicalization import make_path_canonicalizer
 
 # Define the Refactoring Agent
 refactorer_agent = LlmAgent(
     name="refactorer",
     model=os.getenv("ADK_LLM_MODEL", "gemini-1.5-flash"), # Use env var or default
-    instruction=(
+    **build_instruction_kwargs(
         # Instruction should already be updated from previous step to mention base_path_str
         "Your task is to review, potentially fix, and refactor the generated code based on test results and code review feedback.\n"
         "1. Read the list of generated code paths from session state key 'generated_code_paths'. These paths are relative to the project path.\n"
@@ -17,16 +21,14 @@ refactorer_agent = LlmAgent(
         "5. Analyze the 'test_results':\n"
         "   a. If the 'status' is 'FAIL' or 'ERROR', identify the failing tests or errors from the 'output'.\n"
         "   b. Analyze the 'code_review_summary' for suggested improvements.\n"
-        "6. Modify the code in the relevant files to address the failures, errors, or review comments. Use 'read_file' to get the current content and 'write_file' (with overwrite=True) to save changes. When calling these tools, you MUST provide the 'base_path_str' argument with the value from 'project_path', and the 'path' argument must be the relative path within that base path.\n"
+        "6. Modify the code in the relevant files to address the failures, errors, or review comments. Use 'read_file' to get the current content and 'write_file' (with overwrite=True) to save changes. When calling these tools, you MUST provide the 'base_path_str' argument with the value from 'project_path', and the 'path' argument must be the relative path within that base path. When several files are independent of each other, emit the tool calls for all of them TOGETHER in a single response rather than one per turn - calls issued in the same turn are executed concurrently.\n"
         "7. Aim to fix bugs, improve clarity, and adhere to the original plan and requirements.\n"
         "8. After making modifications, output a summary of the changes made."
     ),
-    tools=[
-        read_file,
-        write_file,
-        run_tests # Add the imported tools here
-    ],
-    output_key="refactored_code_paths" # Or potentially a summary key
+    tools=TEST_TOOLS,
+    output_key="refactored_code_paths", # Or potentially a summary key
+    # Same canonicalization as the generator, for cache-stable prompts.
+    after_agent_callback=make_path_canonicalizer("refactored_code_paths")
 )
 
 # Example usage/testing can be added below if needed
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+# In-flight LLM requests keyed by a hash of the canonical request payload,
+# each mapped to (future, registration time). When two agents (parallel
+# branches, or concurrently running workflows) issue byte-identical prompts,
+# the second awaits the first's response instead of paying for a duplicate
+# provider call. The timestamp bounds how long an entry is trusted: if the
+# original call raises, after_model never fires to resolve the future, and
+# the entry must not stall retries forever.
+_inflight: typing.Dict[str, typing.Tuple[asyncio.Future, float]] = {}
+
+# How long a duplicate caller waits on the in-flight request before giving
+# up and issuing its own call (provider tail latencies run to minutes).
+COALESCE_WAIT_SECONDS = float(os.environ.get("LLM_COALESCE_TIMEOUT", 600))
+
+
+def _request_key(llm_request) -> str:
+    """Stable SHA-256 over the canonical serialized request."""
+    try:
+        canonical = llm_request.model_dump_json(exclude_none=True)
+    except Exception:
+        canonical = repr(llm_request)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def coalesce_before_model(callback_context, llm_request):
+    """
+    before_model_callback: if an identical request is already in flight,
+    await and return its response (short-circuiting the model call);
+    otherwise register this request so later duplicates can join it.
+    """
+    key = _request_key(llm_request)
+    entry = _inflight.get(key)
+    if entry is not None:
+        existing, registered_at = entry
+        if not existing.done() and time.monotonic() - registered_at > COALESCE_WAIT_SECONDS:
+            # Registered a full wait window ago and still unresolved: the
+            # original call almost certainly raised, and errors skip the
+            # after_model callback that would resolve the future. Evict so
+            # this retry (and all later ones) proceeds immediately.
+            _inflight.pop(key, None)
+            logger.warning("In-flight LLM request %s never resolved; evicted stale entry", key[:12])
+        else:
+            logger.info("Coalescing duplicate LLM request %s onto in-flight call", key[:12])
+            try:
+                response = await asyncio.wait_for(asyncio.shield(existing), COALESCE_WAIT_SECONDS)
+                # Hand each caller its own copy so response mutations don't leak.
+                return response.model_copy(deep=True) if hasattr(response, "model_copy") else response
+            except asyncio.TimeoutError:
+                # Same stale-entry situation observed from the waiting side;
+                # evict (identity-guarded, in case a fresh call re-registered
+                # the key) so the next identical request starts clean.
+                if _inflight.get(key) is not None and _inflight[key][0] is existing:
+                    _inflight.pop(key, None)
+                    logger.warning("In-flight LLM request %s never resolved; evicted stale entry", key[:12])
+                return None
+            except Exception:
+                # The original call failed: issue our own request.
+                return None
+
+    future: asyncio.Future = asyncio.get_event_loop().create_future()
+    _inflight[key] = (future, time.monotonic())
+    try:
+        # Remember the key for coalesce_after_model on this same invocation.
+        callback_context._coalesce_key = key
+    except Exception:
+        # Context doesn't accept attributes: unregister so no caller can end
+        # up awaiting a future that nobody will ever resolve.
+        _inflight.pop(key, None)
+    return None
+
+
+async def coalesce_after_model(callback_context, llm_response):
+    """
+    after_model_callback: resolves the future registered by
+    coalesce_before_model so any coalesced duplicates receive the response.
+    """
+    key = getattr(callback_context, "_coalesce_key", None)
+    if key is None:
+        return None
+    entry = _inflight.pop(key, None)
+    if entry is not None and not entry[0].done():
+        entry[0].set_result(llm_response)
+    return None
+
+
+def install_request_coalescing(agent) -> None:
+    """
+    Attaches the coalescing callbacks to an LlmAgent, unless it already has
+    its own model callbacks (those are left untouched).
+    """
+    if getattr(agent, "before_model_callback", None) is None and getattr(agent, "after_model_callback", None) is None:
+        agent.before_model_callback = coalesce_before_model
+        agent.after_model_callback = coalesce_after_model
@@ -1,11 +1,13 @@
 import os
 from google.adk.agents import LlmAgent
 
+from .instruction_caching import build_instruction_kwargs
+
 # Define the Requirement Analysis Agent
 requirement_analyzer_agent = LlmAgent(
     name="requirement_analyzer",
     model=os.getenv("ADK_LLM_MODEL", "gemini-2.5-flash"), # Use env var or default
-    instruction=(
+    **build_instruction_kwargs(
         "Your task is to analyze the user's software requirement provided in the initial "
         "session state under the key 'user_requirement'.\n"
         "1. Understand the core goal of the requirement.\n"
@@ -1,31 +1,30 @@
 import os
 from google.adk.agents import LlmAgent
-from src.custom_tools import write_file, read_file, run_tests
+
+from .instruction_caching import build_instruction_kwargs
+
+from src.custom_tools import TEST_TOOLS
 
 # Define the Testing Agent
 tester_agent = LlmAgent(
     name="tester",
     model=os.getenv("ADK_LLM_MODEL", "gemini-2.5-flash"), # Use env var or default
-    instruction=(
+    **build_instruction_kwargs(
         "Your task is to generate and execute unit tests for the provided code based on the requirements and implementation plan.\n"
         "1. Review the requirement details from session state key 'requirement_details'.\n"
         "2. Review the implementation plan from session state key 'implementation_plan'.\n"
         "3. Identify the paths of the generated code from session state key 'generated_code_paths'. This should be a list of relative file paths.\n"
-        "4. For each relevant code file in 'generated_code_paths':\n"
-        "    a. Use the 'read_file' tool to examine the code content.\n"
-        "    b. Generate comprehensive unit tests using the pytest framework and conventions.\n"
-        "    c. Ensure tests cover the main functionality described in the requirements/plan, including edge cases and potential error conditions.\n"
-        "    d. Determine an appropriate relative path for the test file. A good convention is to place it in the same directory as the code file, prefixing the filename with 'test_' (e.g., if code is 'src/module/widget.py', the test file could be 'src/module/test_widget.py').\n"
-        "    e. Use the 'write_file' tool to save the generated pytest code to the determined test file path. Use overwrite=True if necessary.\n"
-        "5. After generating and writing all test files, gather the list of relative paths for *all the test files you created*.\n"
-        "6. Use the 'run_tests' tool, providing it with the list of relative paths to the test files you just created.\n"
-        "7. The final output of your execution should be the result dictionary returned by the 'run_tests' tool."
+        "4. Call the 'read_files' tool ONCE with the full list of paths from 'generated_code_paths' to examine every code file in a single response; do NOT read them one at a time.\n"
+        "5. For each code file:\n"
+        "    a. Generate comprehensive unit tests using the pytest framework and conventions.\n"
+        "    b. Ensure tests cover the main functionality described in the requirements/plan, including edge cases and potential error conditions.\n"
+        "    c. Determine an appropriate relative path for the test file. A good convention is to place it in the same directory as the code file, prefixing the filename with 'test_' (e.g., if code is 'src/module/widget.py', the test file could be 'src/module/test_widget.py').\n"
+        "6. Call the 'write_files' tool ONCE with all the generated test files, as a list of {'path': ..., 'content': ..., 'overwrite': true} items; do NOT write them one at a time.\n"
+        "7. Gather the list of relative paths for *all the test files you created*.\n"
+        "8. Use the 'run_tests' tool, providing it with the list of relative paths to the test files you just created.\n"
+        "9. The final output of your execution should be the result dictionary returned by the 'run_tests' tool."
     ),
-    tools=[
-        write_file,
-        read_file,
-        run_tests
-    ],
+    tools=TEST_TOOLS,
     # The run_tests tool returns a dictionary which will be captured.
     output_key="test_results"
 )
@@ -1,14 +1,33 @@
+import asyncio
+import atexit
+import base64
+import collections
+import concurrent.futures
+import functools
 import json
 import os
 import pathlib
+import queue
+import re
 import subprocess
 import shutil # Needed for checking git executable
+import tempfile
+import threading
+import time
 import typing
 
 import docker
 from docker.errors import ContainerError, ImageNotFound, APIError
 from docker.types import Mount
 
+# Optional: libgit2 bindings. When installed, the git tools run in-process
+# instead of forking a git subprocess per call (~30-60 ms each for config and
+# ref loading); without it they fall back to the subprocess path.
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
 # --- Configuration ---
 
 # Define the root directory for allowed file operations.
@@ -23,38 +42,75 @@ TEST_RUNNER_IMAGE = "python:3.11-slim" # Example: Replace with your actual test
 
 # Define the internal workspace path inside the test container
 CONTAINER_WORKSPACE = "/workspace"
+# Precomputed for the per-path loops in the test tools: one concatenation per
+# path instead of re-interpolating the workspace root each time.
+_CONTAINER_WORKSPACE_PREFIX = CONTAINER_WORKSPACE + "/"
 
 # --- Security Helper ---
 
+# String forms of the root for prefix containment checks: one realpath plus a
+# string compare is far cheaper than Path.resolve() and a Path.parents walk,
+# which stat every component and allocate a Path per level.
+_PROJECT_ROOT_STR = str(PROJECT_ROOT)
+_PROJECT_ROOT_PREFIX = _PROJECT_ROOT_STR + os.sep
+# Slicing a resolved path string at this offset yields its project-relative
+# form without the per-segment comparisons of Path.relative_to.
+_PROJECT_ROOT_PREFIX_LEN = len(_PROJECT_ROOT_PREFIX)
+
+# Precompiled first gate for _resolve_safe_path: absolute paths (POSIX or
+# drive-letter) and any '..' component are rejected with one C-level regex
+# match, before any filesystem work. Paths that pass still go through
+# realpath containment below - this only short-circuits the obvious cases.
+_UNSAFE_PATH_RE = re.compile(r"^(?:/|[A-Za-z]:[/\\])|(?:^|[/\\])\.\.(?:[/\\]|$)")
+
+
 def _is_path_safe(path_to_check: pathlib.Path) -> bool:
     """Checks if the resolved path is within the defined PROJECT_ROOT."""
     try:
-        resolved_path = path_to_check.resolve(strict=True)
-        # Check if the resolved path is within the project root directory
-        return PROJECT_ROOT in resolved_path.parents or resolved_path == PROJECT_ROOT
-    except (FileNotFoundError, RuntimeError):
-        # RuntimeError can occur on Windows with long paths or specific junctions
-        # FileNotFoundError if path doesn't exist (resolve strict=True)
+        # strict=True: fail (return False) when the path doesn't exist,
+        # matching the old resolve(strict=True) behavior.
+        resolved = os.path.realpath(path_to_check, strict=True)
+        return resolved == _PROJECT_ROOT_STR or resolved.startswith(_PROJECT_ROOT_PREFIX)
+    except OSError:
+        # Missing path, or platform-specific resolution failures (e.g. long
+        # paths / junctions on Windows)
         return False
     except Exception:
         # Catch any other potential exceptions during path resolution
         return False
 
+@functools.lru_cache(maxsize=4096)
 def _resolve_safe_path(path_str: str) -> typing.Optional[pathlib.Path]:
-    """Resolves a string path relative to PROJECT_ROOT and checks safety."""
+    """
+    Resolves a string path relative to PROJECT_ROOT and checks safety.
+
+    Memoized: the result depends only on path_str (PROJECT_ROOT is a module
+    constant and resolve() here is non-strict, so existence doesn't matter),
+    while every tool call repeats the same syscall-heavy Path.resolve().
+    Note _is_path_safe is deliberately NOT cached - its strict resolve
+    depends on whether the file currently exists.
+    """
     try:
-        # Attempt to create the path object relative to project root
-        # Forbid absolute paths by checking if path_str starts with '/' or drive letter
-        if os.path.isabs(path_str):
-             print(f"Error: Absolute paths are not allowed: {path_str}")
+        # Cheap regex gate: forbid absolute paths and '..' components outright
+        if _UNSAFE_PATH_RE.search(path_str):
+             if os.path.isabs(path_str):
+                 print(f"Error: Absolute paths are not allowed: {path_str}")
+             else:
+                 print(f"Error: Path traversal detected or path outside project root: {path_str}")
              return None
 
-        # Join with project root and resolve
-        full_path = (PROJECT_ROOT / path_str).resolve()
+        # Join with project root and resolve symlinks/'..' in one realpath
+        # call. A pure normpath + prefix check would be cheaper still, but it
+        # cannot see symlinks: a link inside the tree pointing outside it
+        # would pass the string check (O_NOFOLLOW only guards the final
+        # component, not intermediate directories). realpath is the cheapest
+        # resolution that keeps the containment guarantee, and the lru_cache
+        # above already reduces it to one walk per distinct path string.
+        full_path = os.path.realpath(os.path.join(_PROJECT_ROOT_STR, path_str))
 
         # Check if the resolved path is still within the project root
-        if PROJECT_ROOT in full_path.parents or full_path == PROJECT_ROOT:
-            return full_path
+        if full_path == _PROJECT_ROOT_STR or full_path.startswith(_PROJECT_ROOT_PREFIX):
+            return pathlib.Path(full_path)
         else:
             print(f"Error: Path traversal detected or path outside project root: {path_str}")
             return None
@@ -63,6 +119,114 @@ def _resolve_safe_path(path_str: str) -> typing.Optional[pathlib.Path]:
         return None
 
 
+# --- File Read Cache ---
+
+# Within one workflow turn the explorer, reviewer and refactorer agents all
+# read overlapping sets of files (the reviewer reads every path in
+# 'generated_code_paths', then the refactorer re-reads the same paths).
+# Cache file contents keyed by the resolved path, validated against the
+# file's (mtime_ns, size) so edits made between reads are never served stale.
+# The cache is process-wide, so every agent sharing this module benefits.
+# It is LRU-bounded by total cached bytes so a long session exploring a big
+# tree cannot grow it without limit.
+_FILE_READ_CACHE: "collections.OrderedDict[str, typing.Tuple[int, int, str]]" = collections.OrderedDict()
+_FILE_READ_CACHE_BUDGET = 64 * 1024 * 1024
+_file_read_cache_bytes = 0
+# read_files fans reads out across threads, so LRU bookkeeping needs a lock.
+_file_read_cache_lock = threading.Lock()
+
+
+def _read_cache_lookup(cache_key: str, stat_result: os.stat_result) -> typing.Optional[str]:
+    """Returns cached content if it matches the file's current mtime/size."""
+    with _file_read_cache_lock:
+        cached = _FILE_READ_CACHE.get(cache_key)
+        if cached is not None and cached[0] == stat_result.st_mtime_ns and cached[1] == stat_result.st_size:
+            _FILE_READ_CACHE.move_to_end(cache_key)
+            return cached[2]
+    return None
+
+
+def _read_cache_store(cache_key: str, mtime_ns: int, size: int, content: str) -> None:
+    """Inserts a read result, evicting least-recently-used entries over budget."""
+    global _file_read_cache_bytes
+    if size > _FILE_READ_CACHE_BUDGET:
+        return # Larger than the whole budget; not worth evicting everything for
+    with _file_read_cache_lock:
+        previous = _FILE_READ_CACHE.pop(cache_key, None)
+        if previous is not None:
+            _file_read_cache_bytes -= previous[1]
+        _FILE_READ_CACHE[cache_key] = (mtime_ns, size, content)
+        _file_read_cache_bytes += size
+        while _file_read_cache_bytes > _FILE_READ_CACHE_BUDGET:
+            _, (_, evicted_size, _) = _FILE_READ_CACHE.popitem(last=False)
+            _file_read_cache_bytes -= evicted_size
+
+
+def _invalidate_read_cache(resolved_path: pathlib.Path) -> None:
+    """Drops any cached content for the given resolved path."""
+    global _file_read_cache_bytes
+    with _file_read_cache_lock:
+        entry = _FILE_READ_CACHE.pop(str(resolved_path), None)
+        if entry is not None:
+            _file_read_cache_bytes -= entry[1]
+
+
+# --- Tool-Call Memoization ---
+
+# Different agents frequently repeat the exact same tool call within a turn
+# or two (the reviewer lists a directory the explorer just listed, a retried
+# branch re-runs the same tests). A short-TTL memo keyed by tool name plus
+# canonical arguments collapses those repeats to one real invocation.
+# read_file is NOT memoized here - its mtime/size-validated content cache
+# already does this with precise invalidation.
+_TOOL_MEMO_TTL_SECONDS = 60.0
+_tool_memo: typing.Dict[str, typing.Tuple[float, typing.Any]] = {}
+_tool_memo_lock = threading.Lock()
+
+
+def _invalidate_tool_memo() -> None:
+    """Drops every memoized tool result (called after any write)."""
+    with _tool_memo_lock:
+        _tool_memo.clear()
+
+
+def _memoize_tool(func=None, *, normalize=None):
+    """
+    Decorator memoizing a tool's result for _TOOL_MEMO_TTL_SECONDS, keyed by
+    the tool name and JSON-canonicalized arguments. 'normalize' may supply an
+    order-insensitive key for tools whose argument order is irrelevant
+    (e.g. run_tests path lists). Results are returned as shallow copies so a
+    caller mutating one response cannot corrupt the cached value.
+    """
+    def decorate(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                canonical = normalize(args, kwargs) if normalize else [args, kwargs]
+                key = f.__name__ + json.dumps(canonical, sort_keys=True, default=str)
+            except Exception:
+                return f(*args, **kwargs) # Unkeyable arguments: skip the memo
+            now = time.monotonic()
+            with _tool_memo_lock:
+                entry = _tool_memo.get(key)
+            if entry is not None and entry[0] > now:
+                result = entry[1]
+            else:
+                result = f(*args, **kwargs)
+                with _tool_memo_lock:
+                    _tool_memo[key] = (now + _TOOL_MEMO_TTL_SECONDS, result)
+            if isinstance(result, list):
+                return list(result)
+            if isinstance(result, dict):
+                return dict(result)
+            return result
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
 # --- Custom Tools ---
 
 def read_file(path: str) -> str:
@@ -87,8 +251,34 @@ def read_file(path: str) -> str:
         if not safe_path.is_file():
              return f"Error: File not found at resolved path: {safe_path}"
 
-        with open(safe_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        # Serve from the cache when the file is unchanged since the last read.
+        stat_result = safe_path.stat()
+        cache_key = str(safe_path)
+        cached_content = _read_cache_lookup(cache_key, stat_result)
+        if cached_content is not None:
+            return cached_content
+
+        # Read raw bytes and decode in a single C-level call rather than going
+        # through io.TextIOWrapper's incremental decoder. stat gives the exact
+        # size, so one pre-sized os.read pulls the whole file into a single
+        # allocation with no io-layer buffer growth; a drain loop covers the
+        # rare short read on very large files.
+        fd = os.open(safe_path, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            data = os.read(fd, stat_result.st_size)
+            if len(data) < stat_result.st_size:
+                chunks = [data]
+                read_total = len(data)
+                while data and read_total < stat_result.st_size:
+                    data = os.read(fd, stat_result.st_size - read_total)
+                    chunks.append(data)
+                    read_total += len(data)
+                data = b"".join(chunks)
+        finally:
+            os.close(fd)
+        content = data.decode('utf-8', errors='replace')
+        _read_cache_store(cache_key, stat_result.st_mtime_ns, stat_result.st_size, content)
+        return content
     except FileNotFoundError:
         return f"Error: File not found: {path}"
     except PermissionError:
@@ -96,6 +286,109 @@ def read_file(path: str) -> str:
     except Exception as e:
         return f"Error: An unexpected error occurred while reading file '{path}': {e}"
 
+def read_files(paths: list[str]) -> typing.Dict[str, typing.Any]:
+    """
+    Reads the contents of multiple files within the project directory in one
+    call. Prefer this over repeated 'read_file' calls: reading N files through
+    this tool takes a single tool round-trip instead of N.
+
+    Args:
+        paths: A list of relative paths to files within the project directory.
+               Do not use absolute paths or attempt to navigate outside
+               the project structure (e.g., using '../').
+
+    Returns:
+        A dictionary of the form:
+        {"files": [{"path": p, "content": c, "size": len(c)}, ...]}
+        Entries whose path is invalid or unreadable carry the error message
+        as their 'content' so one bad path does not fail the whole batch.
+    """
+    if len(paths) > 1:
+        # Fan the reads out across a thread pool: read_file releases the GIL
+        # while blocked on disk, so on slow or network-mounted filesystems the
+        # batch completes in roughly the slowest single read, not the sum.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(32, len(paths))) as executor:
+            contents = list(executor.map(read_file, paths))
+    else:
+        contents = [read_file(path) for path in paths]
+    return {
+        "files": [
+            {"path": path, "content": content, "size": len(content)}
+            for path, content in zip(paths, contents)
+        ]
+    }
+
+async def read_file_async(path: str) -> str:
+    """
+    Async variant of 'read_file': reads one file in a worker thread so the
+    event loop (and other agents' in-flight LLM calls) never blocks on disk.
+
+    Args:
+        path: The relative path to the file within the project directory.
+              Do not use absolute paths or attempt to navigate outside
+              the project structure (e.g., using '../').
+
+    Returns:
+        The content of the file as a string, or an error message if
+        the file cannot be read or the path is invalid/unsafe.
+    """
+    return await asyncio.to_thread(read_file, path)
+
+def read_files_bundle(paths: list[str]) -> str:
+    """
+    Reads multiple files and returns them as ONE delimited text block, e.g.:
+
+        <<<FILE src/a.py>>>
+        ...content...
+        <<<END src/a.py>>>
+
+    Prefer this over 'read_files' when the contents will be carried forward
+    across turns: the block is byte-stable for a given set of unchanged
+    files, so it lands in the provider's cached prompt prefix instead of
+    being re-billed each turn.
+
+    Args:
+        paths: A list of relative paths to files within the project directory.
+               Do not use absolute paths or attempt to navigate outside
+               the project structure (e.g., using '../').
+
+    Returns:
+        A single string with each file's content between '<<<FILE path>>>'
+        and '<<<END path>>>' markers. Unreadable paths carry their error
+        message as content so one bad path does not fail the whole batch.
+    """
+    batch = read_files(paths)
+    return "\n".join(
+        f"<<<FILE {entry['path']}>>>\n{entry['content']}\n<<<END {entry['path']}>>>"
+        for entry in batch["files"]
+    )
+
+async def read_files_async(paths: list[str]) -> typing.Dict[str, typing.Any]:
+    """
+    Reads multiple files concurrently and returns their contents in one call.
+    Like 'read_files', but each read runs in a worker thread so the reads
+    overlap and the event loop is never blocked - prefer this when exploring
+    many files at once.
+
+    Args:
+        paths: A list of relative paths to files within the project directory.
+               Do not use absolute paths or attempt to navigate outside
+               the project structure (e.g., using '../').
+
+    Returns:
+        A dictionary of the form:
+        {"files": [{"path": p, "content": c, "size": len(c)}, ...]}
+        Entries whose path is invalid or unreadable carry the error message
+        as their 'content' so one bad path does not fail the whole batch.
+    """
+    # Submit the whole batch in one loop-to-thread handoff instead of one
+    # asyncio.to_thread task per file: the N-way fan-out then happens inside
+    # read_files' thread pool, and the event loop pays a single round-trip
+    # regardless of batch size. (A true io_uring batched-submission reader was
+    # considered here, but the liburing bindings are too niche a dependency;
+    # the thread pool already overlaps the actual disk waits.)
+    return await asyncio.to_thread(read_files, paths)
+
 def write_file(path: str, content: str, overwrite: bool = False) -> typing.Dict[str, typing.Any]:
     """
     Writes content to a file within the project directory.
@@ -121,19 +414,146 @@ def write_file(path: str, content: str, overwrite: bool = False) -> typing.Dict[
         # Ensure the parent directory exists
         safe_path.parent.mkdir(parents=True, exist_ok=True)
 
-        if safe_path.exists() and not overwrite:
-            return {"status": "failure", "message": f"File already exists and overwrite is False: {path}"}
-        if safe_path.is_dir():
-             return {"status": "failure", "message": f"Path points to a directory, cannot write file: {path}"}
-
-        with open(safe_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # One open folds the exists/is-directory checks into a single syscall
+        # (instead of stat + lstat + openat) and closes the check-then-open
+        # race: O_EXCL makes the kernel reject an existing file atomically.
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        if not overwrite:
+            flags |= os.O_EXCL
+        fd = os.open(safe_path, flags, 0o644)
+        with os.fdopen(fd, 'wb', buffering=65536) as f:
+            f.write(content.encode('utf-8'))
+        # A successful write invalidates any cached content for this file.
+        _invalidate_read_cache(safe_path)
+        _invalidate_tool_memo() # Listings and test results may now be stale
         return {"status": "success", "message": f"File written successfully to {path}"}
+    except FileExistsError:
+        # O_EXCL reports an existing directory as EEXIST too; distinguish so
+        # the caller gets the more precise message (error path only, so the
+        # extra stat doesn't matter).
+        if safe_path.is_dir():
+            return {"status": "failure", "message": f"Path points to a directory, cannot write file: {path}"}
+        return {"status": "failure", "message": f"File already exists and overwrite is False: {path}"}
+    except IsADirectoryError:
+        return {"status": "failure", "message": f"Path points to a directory, cannot write file: {path}"}
     except PermissionError:
         return {"status": "failure", "message": f"Permission denied when writing to file: {path}"}
     except Exception as e:
         return {"status": "failure", "message": f"An unexpected error occurred while writing file '{path}': {e}"}
 
+def write_files(items: list[dict]) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Writes multiple files within the project directory in one call. Prefer
+    this over repeated 'write_file' calls: writing N files through this tool
+    takes a single tool round-trip instead of N.
+
+    Args:
+        items: A list of dictionaries, each with:
+               'path': relative path to the file within the project directory,
+               'content': the string content to write,
+               'overwrite' (optional): overwrite an existing file (default False).
+
+    Returns:
+        A list with one status dictionary per item, in input order, each of
+        the same shape 'write_file' returns plus the item's 'path'. A failed
+        item does not stop the remaining writes.
+    """
+    results = []
+    for item in items:
+        result = write_file(
+            item.get("path", ""),
+            item.get("content", ""),
+            overwrite=bool(item.get("overwrite", False)),
+        )
+        result["path"] = item.get("path", "")
+        results.append(result)
+    return results
+
+def copy_file(src_path: str, dst_path: str, overwrite: bool = False) -> typing.Dict[str, typing.Any]:
+    """
+    Copies an existing file to another location within the project directory.
+    Prefer this over read_file followed by write_file when moving a file
+    as-is: the bytes are copied kernel-to-kernel via os.sendfile (zero-copy
+    on Linux), never entering the Python heap or a UTF-8 round-trip.
+
+    Args:
+        src_path: The relative path to the source file within the project.
+        dst_path: The relative path to the destination file within the project.
+        overwrite: If True, overwrite the destination if it exists.
+                   If False, return an error if it exists. Defaults to False.
+
+    Returns:
+        A dictionary indicating the status:
+        {"status": "success", "message": "..."} or
+        {"status": "failure", "message": "Error description."}
+    """
+    safe_src = _resolve_safe_path(src_path)
+    if not safe_src:
+        return {"status": "failure", "message": f"Invalid or unsafe source path specified: {src_path}"}
+    safe_dst = _resolve_safe_path(dst_path)
+    if not safe_dst:
+        return {"status": "failure", "message": f"Invalid or unsafe destination path specified: {dst_path}"}
+
+    in_fd = out_fd = None
+    try:
+        if not safe_src.is_file():
+            return {"status": "failure", "message": f"Source file not found: {src_path}"}
+        safe_dst.parent.mkdir(parents=True, exist_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        if not overwrite:
+            flags |= os.O_EXCL
+        in_fd = os.open(safe_src, os.O_RDONLY | os.O_CLOEXEC)
+        out_fd = os.open(safe_dst, flags, 0o644)
+        size = os.fstat(in_fd).st_size
+        if hasattr(os, "sendfile"):
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        else:
+            # Non-Linux platforms: plain buffered copy.
+            with os.fdopen(in_fd, 'rb') as src_f, os.fdopen(out_fd, 'wb') as dst_f:
+                shutil.copyfileobj(src_f, dst_f, 1024 * 1024)
+            in_fd = out_fd = None  # fdopen took ownership of both fds
+        _invalidate_read_cache(safe_dst)
+        _invalidate_tool_memo() # Listings and test results may now be stale
+        return {"status": "success", "message": f"Copied {src_path} to {dst_path} ({size} bytes)"}
+    except FileExistsError:
+        if safe_dst.is_dir():
+            return {"status": "failure", "message": f"Destination points to a directory, cannot write file: {dst_path}"}
+        return {"status": "failure", "message": f"Destination already exists and overwrite is False: {dst_path}"}
+    except IsADirectoryError:
+        return {"status": "failure", "message": f"Destination points to a directory, cannot write file: {dst_path}"}
+    except PermissionError:
+        return {"status": "failure", "message": f"Permission denied copying '{src_path}' to '{dst_path}'"}
+    except Exception as e:
+        return {"status": "failure", "message": f"An unexpected error occurred copying '{src_path}' to '{dst_path}': {e}"}
+    finally:
+        for fd in (in_fd, out_fd):
+            if fd is not None:
+                os.close(fd)
+
+async def write_file_async(path: str, content: str, overwrite: bool = False) -> typing.Dict[str, typing.Any]:
+    """
+    Async variant of 'write_file': writes one file in a worker thread so the
+    event loop (and other agents' in-flight LLM calls) never blocks on disk.
+
+    Args:
+        path: The relative path to the file within the project directory.
+              Do not use absolute paths or attempt to navigate outside
+              the project structure (e.g., using '../').
+        content: The string content to write to the file.
+        overwrite: If True, overwrite the file if it exists.
+                   If False, return an error if the file exists. Defaults to False.
+
+    Returns:
+        A dictionary indicating the status, as returned by 'write_file'.
+    """
+    return await asyncio.to_thread(write_file, path, content, overwrite)
+
+@_memoize_tool
 def list_directory(path: str = ".", recursive: bool = False) -> typing.Union[list[str], typing.Dict[str, str]]:
     """
     Lists the contents (files and directories) of a specified directory
@@ -161,13 +581,23 @@ def list_directory(path: str = ".", recursive: bool = False) -> typing.Union[lis
     results = []
     try:
         if recursive:
-            for item in safe_path.rglob('*'):
-                # Calculate path relative to the original 'path' argument for consistency
-                relative_item_path = item.relative_to(safe_path)
-                results.append(str(relative_item_path))
+            # Explicit os.scandir stack instead of Path.rglob: DirEntry carries
+            # the kernel-provided type from getdents(2), so no per-entry stat
+            # and no per-entry Path construction.
+            root = str(safe_path)
+            stack = [root]
+            while stack:
+                current_dir = stack.pop()
+                with os.scandir(current_dir) as it:
+                    for entry in it:
+                        # Paths relative to the original 'path' argument for consistency
+                        results.append(os.path.relpath(entry.path, root))
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
         else:
-            for item in safe_path.iterdir():
-                results.append(item.name)
+            with os.scandir(safe_path) as it:
+                for entry in it:
+                    results.append(entry.name)
         return results
     except PermissionError:
          return {"status": "failure", "message": f"Permission denied when listing directory: {path}"}
@@ -175,6 +605,117 @@ def list_directory(path: str = ".", recursive: bool = False) -> typing.Union[lis
         return {"status": "failure", "message": f"An unexpected error occurred listing directory '{path}': {e}"}
 
 
+def static_analysis(paths: list[str]) -> typing.Dict[str, typing.Any]:
+    """
+    Runs a fast, deterministic lint pass over the given files using 'ruff'
+    (falling back to 'pyflakes' when ruff is not installed). Mechanical
+    findings - style violations, unused imports, undefined names - are
+    reported here at near-zero cost, so an LLM review can focus purely on
+    semantic issues.
+
+    Args:
+        paths: A list of relative paths to Python files within the project
+               directory. Do not use absolute paths or attempt to navigate
+               outside the project structure.
+
+    Returns:
+        A dictionary with 'status' ('success', 'skipped', or 'failure'),
+        the 'tool' used, and its 'findings' output (JSON for ruff, plain
+        text for pyflakes). 'skipped' means no linter is installed.
+    """
+    if not paths:
+        return {"status": "failure", "message": "No paths provided for static analysis."}
+
+    validated_paths = []
+    for p in paths:
+        safe_path = _resolve_safe_path(p)
+        if not safe_path:
+            return {"status": "failure", "message": f"Invalid or unsafe path: {p}"}
+        validated_paths.append(str(safe_path))
+
+    if shutil.which("ruff"):
+        command = ["ruff", "check", "--output-format=json"] + validated_paths
+    elif shutil.which("pyflakes"):
+        command = ["pyflakes"] + validated_paths
+    else:
+        return {
+            "status": "skipped",
+            "message": "Neither 'ruff' nor 'pyflakes' is installed; static analysis unavailable.",
+        }
+
+    try:
+        # Non-zero exit just means findings were reported; not an error.
+        result = subprocess.run(command, capture_output=True, text=True, check=False, encoding='utf-8')
+        return {
+            "status": "success",
+            "tool": command[0],
+            "findings": result.stdout,
+            "errors": result.stderr.strip(),
+        }
+    except Exception as e:
+        return {"status": "failure", "message": f"Static analysis failed to run: {e}"}
+
+
+# Directory names skipped by scan_codebase; these are build/VCS artifacts
+# that waste tokens and never inform implementation planning.
+SCAN_IGNORE_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv"}
+SCAN_IGNORE_SUFFIXES = (".pyc",)
+
+def scan_codebase(root: str = ".", max_depth: int = 4) -> str:
+    """
+    Walks a directory tree in a single call and returns a compact summary of
+    its structure. Prefer this over repeated 'list_directory' calls when
+    exploring a codebase: one call covers the whole tree.
+
+    Args:
+        root: The relative path to the directory to scan, within the project.
+              Defaults to the project root ('.'). Do not use absolute paths
+              or attempt to navigate outside the project structure.
+        max_depth: Maximum directory depth to descend (default 4).
+
+    Returns:
+        One line per entry, relative to 'root': directories as 'path/',
+        files as 'path<TAB>size_bytes<TAB>extension'. Common noise
+        directories (.git, __pycache__, node_modules, ...) are skipped.
+        Returns an error message string if the path is invalid or unsafe.
+    """
+    safe_root = _resolve_safe_path(root)
+    if not safe_root:
+        return f"Error: Invalid or unsafe path specified: {root}"
+    if not safe_root.is_dir():
+        return f"Error: Path is not a directory: {root}"
+
+    lines = []
+    # Iterative walk over os.scandir handles: cheaper than Path.rglob because
+    # the DirEntry objects carry cached stat/type info (fewer syscalls), and
+    # context-managing each handle closes its FD promptly.
+    stack = [(safe_root, 0)]
+    while stack:
+        current_dir, depth = stack.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    if entry.name in SCAN_IGNORE_DIRS:
+                        continue
+                    rel_path = os.path.relpath(entry.path, safe_root)
+                    if entry.is_dir(follow_symlinks=False):
+                        lines.append(f"{rel_path}/")
+                        if depth + 1 < max_depth:
+                            stack.append((pathlib.Path(entry.path), depth + 1))
+                    elif entry.is_file(follow_symlinks=False):
+                        if entry.name.endswith(SCAN_IGNORE_SUFFIXES):
+                            continue
+                        extension = pathlib.Path(entry.name).suffix.lstrip(".")
+                        lines.append(f"{rel_path}\t{entry.stat().st_size}\t{extension}")
+        except PermissionError:
+            lines.append(f"{os.path.relpath(current_dir, safe_root)}/\t<permission denied>")
+        except OSError as e:
+            lines.append(f"{os.path.relpath(current_dir, safe_root)}/\t<error: {e}>")
+
+    lines.sort()
+    return "\n".join(lines)
+
+
 # --- Git Tools ---
 
 def _run_git_command(base_dir: pathlib.Path, command: list[str]) -> dict:
@@ -211,6 +752,41 @@ def _run_git_command(base_dir: pathlib.Path, command: list[str]) -> dict:
         return {"status": "failure", "message": f"An unexpected error occurred running git command in {base_dir}: {e}"}
 
 
+async def _run_git_command_async(base_dir: pathlib.Path, command: list[str]) -> dict:
+    """
+    Async variant of _run_git_command using asyncio's subprocess support.
+    The event loop stays free while git runs, so git operations overlap
+    with concurrent LLM and tool I/O instead of blocking it.
+    """
+    if not shutil.which("git"):
+        return {"status": "failure", "message": "Error: 'git' command not found in PATH."}
+    try:
+        if not base_dir.is_dir():
+             return {"status": "failure", "message": f"Error: Base directory does not exist: {base_dir}"}
+
+        proc = await asyncio.create_subprocess_exec(
+            "git", *command,
+            cwd=str(base_dir),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout_bytes, stderr_bytes = await proc.communicate()
+        stdout = stdout_bytes.decode('utf-8', errors='replace')
+        stderr = stderr_bytes.decode('utf-8', errors='replace')
+        if proc.returncode == 0:
+            return {"status": "success", "message": f"Git command '{' '.join(command)}' executed successfully.", "stdout": stdout, "stderr": stderr}
+        else:
+            error_message = f"Git command '{' '.join(command)}' failed with exit code {proc.returncode}."
+            error_details = f"Stderr: {stderr.strip()}\nStdout: {stdout.strip()}"
+            return {"status": "failure", "message": error_message, "details": error_details.strip()}
+    except FileNotFoundError:
+         return {"status": "failure", "message": f"Error: Base directory not found during git execution: {base_dir}"}
+    except PermissionError:
+        return {"status": "failure", "message": f"Error: Permission denied executing git command in {base_dir}."}
+    except Exception as e:
+        return {"status": "failure", "message": f"An unexpected error occurred running git command in {base_dir}: {e}"}
+
+
 def git_init(base_path_str: str) -> dict:
     """
     Initializes a Git repository in the specified base project directory if one doesn't exist.
@@ -235,7 +811,14 @@ def git_init(base_path_str: str) -> dict:
     if git_dir.exists():
         return {"status": "success", "message": f"Git repository already exists in {base_path_str}."}
 
-    # Run git init
+    # In-process init via libgit2 when available; subprocess otherwise.
+    if pygit2 is not None:
+        try:
+            pygit2.init_repository(str(base_dir))
+            return {"status": "success", "message": f"Initialized Git repository in {base_path_str}."}
+        except Exception as e:
+            print(f"Warning: pygit2 init failed ({e}); falling back to git subprocess.")
+
     return _run_git_command(base_dir, ["init"])
 
 
@@ -269,8 +852,158 @@ def git_add(base_path_str: str, paths_to_add: list[str]) -> dict:
         if os.path.isabs(p) or ".." in p:
              return {"status": "failure", "message": f"Invalid or potentially unsafe relative path provided for git add: {p}"}
 
-    # Run git add command
-    return _run_git_command(base_dir, ["add"] + paths_to_add)
+    # In-process staging via libgit2 when available; no fork/exec, no
+    # per-call config and ref loading.
+    if pygit2 is not None:
+        try:
+            repo = pygit2.Repository(str(base_dir))
+            repo.index.add_all(paths_to_add)
+            repo.index.write()
+            return {"status": "success", "message": f"Staged {len(paths_to_add)} path(s)."}
+        except Exception as e:
+            print(f"Warning: pygit2 add failed ({e}); falling back to git subprocess.")
+
+    # Pass the paths through a pathspec file rather than argv: a large
+    # generated-file list can exceed ARG_MAX, and NUL separation handles
+    # any filename git itself accepts.
+    pathspec_file = None
+    try:
+        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.pathspec', delete=False) as f:
+            pathspec_file = f.name
+            f.write("\0".join(paths_to_add))
+        return _run_git_command(
+            base_dir,
+            ["add", f"--pathspec-from-file={pathspec_file}", "--pathspec-file-nul"],
+        )
+    finally:
+        if pathspec_file is not None:
+            try:
+                os.unlink(pathspec_file)
+            except OSError:
+                pass
+
+
+def git_commit_all(base_path_str: str, paths_to_add: list[str], commit_message: str) -> dict:
+    """
+    Initializes the repository if needed, stages the given paths, and commits
+    them, all in one tool call. Prefer this over separate 'git_init',
+    'git_add' and 'git_commit' calls: it saves two tool round-trips per
+    commit.
+
+    Args:
+        base_path_str: The relative or absolute path to the base project directory.
+        paths_to_add: A list of relative paths (strings) *within* the base_path_str
+                      to stage and commit (e.g., ["src/main.py", "docs/"]).
+        commit_message: The commit message string.
+
+    Returns:
+        A dictionary indicating the status (success/failure) and a message
+        describing how far the sequence got.
+    """
+    steps = (
+        ("git_init", lambda: git_init(base_path_str)),
+        ("git_add", lambda: git_add(base_path_str, paths_to_add)),
+        ("git_commit", lambda: git_commit(base_path_str, commit_message)),
+    )
+    for step_name, step in steps:
+        result = step()
+        if result.get("status") != "success":
+            result["message"] = f"{step_name}: {result.get('message', '')}"
+            return result
+    return {"status": "success", "message": f"Initialized (if needed), staged {len(paths_to_add)} path(s), and committed."}
+
+
+async def agit_init(base_path_str: str) -> dict:
+    """
+    Async variant of 'git_init': initializes a Git repository in the base
+    project directory if one doesn't exist, without blocking the event loop.
+
+    Args:
+        base_path_str: The relative or absolute path to the base project directory.
+
+    Returns:
+        A dictionary indicating the status (success/failure) and a message.
+    """
+    try:
+        base_dir = pathlib.Path(base_path_str).resolve(strict=True)
+    except FileNotFoundError:
+        return {"status": "failure", "message": f"Base path directory not found: {base_path_str}"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Error resolving base path '{base_path_str}': {e}"}
+
+    if (base_dir / ".git").exists():
+        return {"status": "success", "message": f"Git repository already exists in {base_path_str}."}
+
+    return await _run_git_command_async(base_dir, ["init"])
+
+
+async def agit_add(base_path_str: str, paths_to_add: list[str]) -> dict:
+    """
+    Async variant of 'git_add': stages the given relative paths in the Git
+    repository at base_path_str, without blocking the event loop.
+
+    Args:
+        base_path_str: The relative or absolute path to the base project directory (which should be a Git repo).
+        paths_to_add: A list of relative paths (strings) *within* the base_path_str
+                      to stage (e.g., ["src/main.py", "docs/"]). Use "." to add all changes.
+
+    Returns:
+        A dictionary indicating the status (success/failure) and a message.
+    """
+    try:
+        base_dir = pathlib.Path(base_path_str).resolve(strict=True)
+    except FileNotFoundError:
+        return {"status": "failure", "message": f"Base path directory not found: {base_path_str}"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Error resolving base path '{base_path_str}': {e}"}
+
+    if not paths_to_add:
+        return {"status": "failure", "message": "No paths provided to stage."}
+    for p in paths_to_add:
+        if os.path.isabs(p) or ".." in p:
+             return {"status": "failure", "message": f"Invalid or potentially unsafe relative path provided for git add: {p}"}
+
+    # Same ARG_MAX-safe pathspec-file mechanism as the sync tool.
+    pathspec_file = None
+    try:
+        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.pathspec', delete=False) as f:
+            pathspec_file = f.name
+            f.write("\0".join(paths_to_add))
+        return await _run_git_command_async(
+            base_dir,
+            ["add", f"--pathspec-from-file={pathspec_file}", "--pathspec-file-nul"],
+        )
+    finally:
+        if pathspec_file is not None:
+            try:
+                os.unlink(pathspec_file)
+            except OSError:
+                pass
+
+
+async def agit_commit(base_path_str: str, commit_message: str) -> dict:
+    """
+    Async variant of 'git_commit': commits the staged changes in the Git
+    repository at base_path_str, without blocking the event loop.
+
+    Args:
+        base_path_str: The relative or absolute path to the base project directory (which should be a Git repo).
+        commit_message: The commit message string.
+
+    Returns:
+        A dictionary indicating the status (success/failure) and a message.
+    """
+    try:
+        base_dir = pathlib.Path(base_path_str).resolve(strict=True)
+    except FileNotFoundError:
+        return {"status": "failure", "message": f"Base path directory not found: {base_path_str}"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Error resolving base path '{base_path_str}': {e}"}
+
+    if not commit_message:
+        return {"status": "failure", "message": "Commit message cannot be empty."}
+
+    return await _run_git_command_async(base_dir, ["commit", "-m", commit_message])
 
 
 def git_commit(base_path_str: str, commit_message: str) -> dict:
@@ -295,11 +1028,428 @@ def git_commit(base_path_str: str, commit_message: str) -> dict:
     if not commit_message:
         return {"status": "failure", "message": "Commit message cannot be empty."}
 
+    # In-process commit via libgit2 when available. Falls back to the
+    # subprocess path on any error (including a missing committer identity,
+    # where the git CLI produces the clearer diagnostic).
+    if pygit2 is not None:
+        try:
+            repo = pygit2.Repository(str(base_dir))
+            signature = repo.default_signature
+            tree = repo.index.write_tree()
+            parents = [] if repo.head_is_unborn else [repo.head.target]
+            commit_id = repo.create_commit("HEAD", signature, signature, commit_message, tree, parents)
+            return {"status": "success", "message": f"Created commit {str(commit_id)[:12]}."}
+        except Exception as e:
+            print(f"Warning: pygit2 commit failed ({e}); falling back to git subprocess.")
+
     # Run git commit command
     # Use -m flag for the message
     return _run_git_command(base_dir, ["commit", "-m", commit_message])
 
 
+# --- Persistent Test Container Pool ---
+
+# Long-lived test-runner containers reused across run_tests calls. One-shot
+# containers pay full create/start/stop overhead (hundreds of ms to seconds)
+# per call, which dominates when an agent loop runs tests repeatedly. A small
+# pool (rather than a single container) lets concurrent run_tests calls - the
+# LLM can issue several in one turn - run in parallel instead of serializing
+# on one container's exec queue.
+TEST_CONTAINER_POOL_SIZE = int(os.environ.get("TEST_CONTAINER_POOL_SIZE", 4))
+
+_idle_test_containers: "queue.Queue" = queue.Queue()
+_live_test_containers: list = []
+_test_container_lock = threading.Lock()
+_test_container_cleanup_registered = False
+
+# Cached Docker client and image-presence flag. Client construction parses the
+# environment and connects to the daemon socket, and the image probe is a
+# daemon round-trip; neither result changes within a process lifetime.
+_docker_client = None
+_image_ready = False
+
+
+def _get_docker_client():
+    """Returns the shared Docker client, creating it on first use."""
+    global _docker_client
+    if _docker_client is None:
+        try:
+            # Size the daemon HTTP connection pool for the container pool:
+            # concurrent run_tests execs each hold a connection, and the
+            # default pool would serialize them.
+            _docker_client = docker.from_env(max_pool_size=16)
+        except TypeError:
+            # Older docker SDKs don't take max_pool_size
+            _docker_client = docker.from_env()
+    return _docker_client
+
+
+def _ensure_test_image(client) -> None:
+    """Checks the test-runner image is present (pulling if not), once per process."""
+    global _image_ready
+    if _image_ready:
+        return
+    try:
+        client.images.get(TEST_RUNNER_IMAGE)
+    except ImageNotFound:
+        print(f"Test runner image '{TEST_RUNNER_IMAGE}' not found. Pulling...")
+        client.images.pull(TEST_RUNNER_IMAGE)
+    _image_ready = True
+
+
+# Opt-in: instead of bind-mounting PROJECT_ROOT into every test container,
+# snapshot the project once per session into a Docker named volume and mount
+# that. The runtime then serves file metadata from the volume instead of
+# re-traversing the host bind mount each run, and the snapshot excludes
+# SCAN_IGNORE_DIRS noise (.git, __pycache__, ...). Off by default because the
+# snapshot is taken once - code written after it (e.g. by the generator) is
+# not visible to the tests, which only suits review-only or re-run sessions.
+RUN_TESTS_VOLUME_SNAPSHOT = os.environ.get("RUN_TESTS_VOLUME_SNAPSHOT") == "1"
+
+_test_volume = None
+
+
+def _get_test_volume(client):
+    """Creates and populates the per-session snapshot volume on first use."""
+    global _test_volume
+    if _test_volume is not None:
+        return _test_volume
+
+    import io
+    import tarfile
+
+    volume = client.volumes.create(name=f"codesynth-tests-{os.getpid()}")
+
+    def _tar_filter(tarinfo):
+        parts = tarinfo.name.split("/")
+        if any(part in SCAN_IGNORE_DIRS for part in parts):
+            return None
+        if tarinfo.name.endswith(SCAN_IGNORE_SUFFIXES):
+            return None
+        return tarinfo
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        tar.add(str(PROJECT_ROOT), arcname=".", filter=_tar_filter)
+    buffer.seek(0)
+
+    # put_archive needs a container with the volume mounted; a created (never
+    # started) helper is enough.
+    helper = client.containers.create(
+        image=TEST_RUNNER_IMAGE,
+        command=["true"],
+        mounts=[Mount(target=CONTAINER_WORKSPACE, source=volume.name, type='volume')],
+    )
+    try:
+        helper.put_archive(CONTAINER_WORKSPACE, buffer.getvalue())
+    finally:
+        helper.remove(force=True)
+
+    _test_volume = volume
+    return volume
+
+
+def _remove_test_volume() -> None:
+    """Removes the per-session snapshot volume, if one was created."""
+    global _test_volume
+    if _test_volume is not None:
+        try:
+            _test_volume.remove(force=True)
+        except Exception:
+            pass
+        _test_volume = None
+
+
+def _stop_test_containers() -> None:
+    """Stops and removes every pooled test container."""
+    with _test_container_lock:
+        containers, _live_test_containers[:] = _live_test_containers[:], []
+    while not _idle_test_containers.empty():
+        try:
+            _idle_test_containers.get_nowait()
+        except queue.Empty:
+            break
+    for container in containers:
+        try:
+            container.stop(timeout=5)
+            container.remove(force=True)
+        except Exception:
+            pass # Best effort; the daemon may already have reaped it
+    _remove_test_volume()
+
+
+def _discard_test_container(container) -> None:
+    """Removes a dead or misbehaving container from the pool."""
+    with _test_container_lock:
+        if container in _live_test_containers:
+            _live_test_containers.remove(container)
+    try:
+        container.remove(force=True)
+    except Exception:
+        pass
+
+
+def _start_test_container(client):
+    """Launches one pooled test-runner container."""
+    global _test_container_cleanup_registered
+    if RUN_TESTS_VOLUME_SNAPSHOT:
+        workspace_mount = Mount(target=CONTAINER_WORKSPACE, source=_get_test_volume(client).name, type='volume', read_only=True)
+    else:
+        workspace_mount = Mount(target=CONTAINER_WORKSPACE, source=str(PROJECT_ROOT), type='bind', read_only=True)
+    mounts = [
+        workspace_mount,
+        # Scratch space (JSON reports, pytest caches) on tmpfs: per-container,
+        # memory-backed, and gone with the container.
+        Mount(target="/tmp", source=None, type='tmpfs'),
+    ]
+    container = client.containers.run(
+        image=TEST_RUNNER_IMAGE,
+        command=["sleep", "infinity"], # Keep alive for exec_run reuse
+        mounts=mounts,
+        working_dir=CONTAINER_WORKSPACE,
+        network_disabled=True,
+        detach=True,
+    )
+    if RUN_TESTS_WARM_WORKER:
+        _start_pytest_worker(container)
+    with _test_container_lock:
+        _live_test_containers.append(container)
+        if not _test_container_cleanup_registered:
+            atexit.register(_stop_test_containers)
+            _test_container_cleanup_registered = True
+    return container
+
+
+def _acquire_test_container(client):
+    """
+    Takes a test-runner container from the pool, starting one lazily when the
+    pool has capacity. Blocks when all TEST_CONTAINER_POOL_SIZE containers
+    are busy. Callers must hand the container back via
+    _release_test_container (or _discard_test_container on failure).
+    """
+    while True:
+        try:
+            container = _idle_test_containers.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            container.reload()
+            if container.status == "running":
+                return container
+        except Exception:
+            pass # Container vanished; fall through and discard it
+        _discard_test_container(container)
+
+    with _test_container_lock:
+        has_capacity = len(_live_test_containers) < TEST_CONTAINER_POOL_SIZE
+    if has_capacity:
+        return _start_test_container(client)
+    # Pool exhausted: wait for a busy container to come back.
+    return _idle_test_containers.get()
+
+
+def _release_test_container(container) -> None:
+    """Returns a healthy container to the idle pool."""
+    _idle_test_containers.put(container)
+
+
+# Pytest JSON report path inside the test container. The pytest-json-report
+# plugin (bake it into TEST_RUNNER_IMAGE) gives exact pass/fail/error counts;
+# without it we fall back to heuristic string matching on stdout.
+CONTAINER_JSON_REPORT = "/tmp/report.json"
+
+
+def _parse_json_report(report_text: str, output: str) -> typing.Optional[dict]:
+    """
+    Builds the run_tests result dict from a pytest-json-report payload.
+    Returns None when the payload is missing or malformed, so callers can
+    fall back to heuristic stdout parsing.
+    """
+    try:
+        report = json.loads(report_text)
+        summary = report["summary"]
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None
+
+    passed_count = int(summary.get("passed", 0))
+    failed_count = int(summary.get("failed", 0))
+    error_count = int(summary.get("error", 0))
+    status = "PASS" if report.get("exitcode", 1) == 0 else "FAIL"
+
+    return {
+        "status": status,
+        "passed": passed_count,
+        "failed": failed_count,
+        "errors": error_count,
+        "output": output
+    }
+
+
+# --- Warm Pytest Worker (opt-in) ---
+
+# Every pytest invocation re-pays interpreter startup, _pytest imports and
+# conftest collection (~300-600 ms) even inside a reused container. With
+# RUN_TESTS_WARM_WORKER=1, each pooled container runs a resident worker loop
+# that keeps pytest imported: run_tests writes the path list to a request
+# FIFO and reads one JSON result line back, paying only collection for the
+# requested paths. Opt-in because a wedged worker blocks its container's
+# FIFO protocol (run_tests then falls back to a plain exec).
+RUN_TESTS_WARM_WORKER = os.environ.get("RUN_TESTS_WARM_WORKER") == "1"
+
+_WORKER_REQUEST_FIFO = "/tmp/pytest_req"
+_WORKER_RESPONSE_FIFO = "/tmp/pytest_resp"
+
+# Source for the resident worker process, started detached inside each pooled
+# container. Between runs it drops modules imported during the run, so
+# project code is re-imported fresh while pytest/_pytest stay warm.
+_PYTEST_WORKER_SOURCE = f"""
+import contextlib, io, json, os, sys
+REQ = {_WORKER_REQUEST_FIFO!r}
+RESP = {_WORKER_RESPONSE_FIFO!r}
+import pytest
+baseline = set(sys.modules)
+while True:
+    with open(REQ) as f:
+        line = f.readline().strip()
+    if not line:
+        continue
+    try:
+        paths = json.loads(line)
+    except ValueError:
+        continue
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+        try:
+            code = int(pytest.main(paths + ["-p", "no:cacheprovider"]))
+        except SystemExit as e:
+            code = int(e.code or 0)
+        except Exception:
+            code = 3
+    for name in list(sys.modules):
+        if name not in baseline:
+            del sys.modules[name]
+    with open(RESP, "w") as f:
+        f.write(json.dumps({{"exitcode": code, "output": buf.getvalue()}}))
+"""
+
+
+def _start_pytest_worker(container) -> None:
+    """Creates the FIFO pair and launches the resident pytest worker."""
+    # Pre-create the FIFOs so the first request cannot race the worker's
+    # startup and turn the pathname into a regular file.
+    container.exec_run(["sh", "-c", f"mkfifo -m 600 {_WORKER_REQUEST_FIFO} {_WORKER_RESPONSE_FIFO} 2>/dev/null || true"])
+    container.exec_run(["python", "-c", _PYTEST_WORKER_SOURCE], detach=True)
+
+
+def _run_tests_via_worker(container, container_paths: list) -> typing.Optional[dict]:
+    """
+    Dispatches one test run to the container's resident pytest worker.
+    Returns the parsed result dict, or None when the worker protocol fails
+    (callers then fall back to a plain exec).
+    """
+    request = base64.b64encode(json.dumps(container_paths).encode("utf-8")).decode("ascii")
+    command = ["sh", "-c", f"echo {request} | base64 -d > {_WORKER_REQUEST_FIFO} && cat {_WORKER_RESPONSE_FIFO}"]
+    exit_code, payload = container.exec_run(command, stdout=True, stderr=True)
+    if exit_code != 0 or not payload:
+        return None
+    try:
+        response = json.loads(payload.decode("utf-8"))
+    except (json.JSONDecodeError, ValueError, UnicodeDecodeError):
+        return None
+    output = response.get("output", "")
+    status = "PASS" if response.get("exitcode") == 0 else "FAIL"
+    return _parse_test_output(status, output)
+
+
+# Fail-fast mode for run_tests: pass '-x --tb=short' so pytest stops at the
+# first failure and the LLM gets feedback after (first failing test) instead
+# of (whole suite). Off by default because the full pass/fail counts are lost.
+RUN_TESTS_FAIL_FAST = os.environ.get("RUN_TESTS_FAIL_FAST") == "1"
+
+# pytest-xdist worker count for run_tests ('auto' or an integer as a string;
+# unset disables xdist). Requires pytest-xdist in TEST_RUNNER_IMAGE; when the
+# plugin is missing, the usage-error rerun below drops the flags.
+RUN_TESTS_XDIST_WORKERS = os.environ.get("RUN_TESTS_XDIST_WORKERS", "")
+
+# Both flags above are fixed for the process lifetime, so the pytest argv
+# prefix is assembled once at import time instead of spliced per call.
+_PYTEST_ARGV_PREFIX = ("pytest",)
+if RUN_TESTS_XDIST_WORKERS:
+    # pytest-xdist workers; --dist=loadfile keeps each file's tests (and
+    # their fixtures) on one worker.
+    _PYTEST_ARGV_PREFIX += ("-n", RUN_TESTS_XDIST_WORKERS, "--dist=loadfile")
+if RUN_TESTS_FAIL_FAST:
+    _PYTEST_ARGV_PREFIX += ("-x", "--tb=short")
+
+
+# Only the tail of a streamed test log is retained for the result dict; the
+# counts that matter (and the 'unrecognized arguments' usage error) are all
+# in pytest's trailing summary, and keeping the whole log would make peak
+# memory proportional to suite verbosity.
+_EXEC_OUTPUT_TAIL_BYTES = 64 * 1024
+
+
+def _exec_streaming(client, container, command) -> typing.Tuple[int, str]:
+    """
+    Runs a command in the container via the low-level exec API, consuming
+    output as it is produced instead of buffering the whole run. The first
+    failure marker is surfaced immediately, so a long suite's early failures
+    are visible before the run completes. Only the last
+    _EXEC_OUTPUT_TAIL_BYTES of output are retained.
+    """
+    api = client.api
+    exec_id = api.exec_create(container.id, command, stdout=True, stderr=True)["Id"]
+    chunks = collections.deque()
+    buffered_bytes = 0
+    failure_seen = False
+    for stdout_chunk, stderr_chunk in api.exec_start(exec_id, stream=True, demux=True):
+        for chunk in (stdout_chunk, stderr_chunk):
+            if not chunk:
+                continue
+            chunks.append(chunk)
+            buffered_bytes += len(chunk)
+            # Trim whole chunks from the front once the tail budget is met.
+            while chunks and buffered_bytes - len(chunks[0]) >= _EXEC_OUTPUT_TAIL_BYTES:
+                buffered_bytes -= len(chunks.popleft())
+            if not failure_seen and b"FAILED" in chunk:
+                failure_seen = True
+                print("First test failure detected; pytest output still streaming...")
+    exit_code = api.exec_inspect(exec_id).get("ExitCode")
+    return (1 if exit_code is None else exit_code), b"".join(chunks).decode("utf-8", errors="replace")
+
+
+# pytest's "=== N passed, M failed ... ===" summary line; the numbers give the
+# real counts rather than a per-occurrence tally (which miscounts "warning"
+# lines and FAILED listings).
+_PYTEST_SUMMARY_RE = re.compile(r"\b(\d+) (passed|failed|errors?)\b")
+
+
+def _parse_test_output(status: str, output: str) -> dict:
+    """Builds the run_tests result dict from the pytest output."""
+    # --- Basic Output Parsing (Example for pytest) ---
+    # The summary line lives at the end of the output, so only the tail needs
+    # scanning. Still heuristic; the json-report path is preferred.
+    counts = {"passed": 0, "failed": 0, "error": 0}
+    for match in _PYTEST_SUMMARY_RE.finditer(output[-4096:]):
+        counts[match.group(2).rstrip("s")] += int(match.group(1))
+    passed_count = counts["passed"]
+    failed_count = counts["failed"]
+    error_count = counts["error"]
+
+    # Refine status based on counts if possible
+    if status == "PASS" and (failed_count > 0 or error_count > 0):
+        status = "FAIL" # Mark as FAIL if tests ran but some failed/errored
+
+    return {
+        "status": status,
+        "passed": passed_count,
+        "failed": failed_count,
+        "errors": error_count,
+        "output": output
+    }
+
+
+@_memoize_tool(normalize=lambda args, kwargs: sorted(args[0] if args else kwargs.get("test_paths") or []))
 def run_tests(test_paths: list[str]) -> dict:
     """
     Runs tests (e.g., pytest) within a specified list of paths using a secure,
@@ -322,39 +1472,96 @@ def run_tests(test_paths: list[str]) -> dict:
 
     # Validate all paths before proceeding
     validated_container_paths = []
+    relative_paths = []
     for p in test_paths:
         safe_host_path = _resolve_safe_path(p)
         if not safe_host_path:
              return {"status": "ERROR", "message": f"Invalid or unsafe test path: {p}", "output": ""}
-        # Convert host path to the expected path inside the container
-        relative_path = safe_host_path.relative_to(PROJECT_ROOT)
-        validated_container_paths.append(f"{CONTAINER_WORKSPACE}/{relative_path}")
+        # Convert host path to the expected path inside the container. The
+        # resolved path is known to sit under PROJECT_ROOT, so a string slice
+        # replaces Path.relative_to's segment-by-segment comparison.
+        relative_path = str(safe_host_path)[_PROJECT_ROOT_PREFIX_LEN:] or "."
+        relative_paths.append(relative_path)
+        validated_container_paths.append(_CONTAINER_WORKSPACE_PREFIX + relative_path)
 
     try:
-        client = docker.from_env()
-        # Ensure the test runner image exists locally
-        try:
-            client.images.get(TEST_RUNNER_IMAGE)
-        except ImageNotFound:
-             print(f"Test runner image '{TEST_RUNNER_IMAGE}' not found. Pulling...")
-             client.images.pull(TEST_RUNNER_IMAGE)
-
+        client = _get_docker_client()
+        _ensure_test_image(client)
     except Exception as e:
         return {"status": "ERROR", "message": f"Docker client initialization failed: {e}", "output": ""}
 
-    # Mount the entire project root read-only into the container's workspace
-    # Adjust if specific subdirs are needed or write access is required for coverage etc.
+    # Mount only the common ancestor of the requested paths read-only: on large
+    # repos this keeps overlay setup and pytest collection confined to the
+    # relevant subtree instead of the whole project. (Pooled containers still
+    # mount the full root since they are reused across unrelated calls.)
+    common_rel = os.path.commonpath(relative_paths)
+    if common_rel and not (PROJECT_ROOT / common_rel).is_dir():
+        # A single file was requested; mount its parent directory.
+        common_rel = os.path.dirname(common_rel)
+    if common_rel and common_rel != ".":
+        workspace_mount = Mount(
+            target=f"{CONTAINER_WORKSPACE}/{common_rel}",
+            source=str(PROJECT_ROOT / common_rel),
+            type='bind', read_only=True,
+        )
+    else:
+        workspace_mount = Mount(target=CONTAINER_WORKSPACE, source=str(PROJECT_ROOT), type='bind', read_only=True)
     mounts = [
-        Mount(target=CONTAINER_WORKSPACE, source=str(PROJECT_ROOT), type='bind', read_only=True)
+        workspace_mount,
+        # Scratch space for pytest's cache and report writes stays off overlayfs.
+        Mount(target="/tmp", source=None, type='tmpfs'),
     ]
 
     # Construct the command to run inside the container (e.g., using pytest)
     # This assumes pytest is installed in the TEST_RUNNER_IMAGE
-    # Add flags like '-v' for verbose, '--json-report' if parsing JSON output
-    test_command = ["pytest"] + validated_container_paths
+    test_command = [*_PYTEST_ARGV_PREFIX, *validated_container_paths]
 
     print(f"Running tests in Docker. Image: {TEST_RUNNER_IMAGE}, Command: {' '.join(test_command)}")
 
+    # Preferred path: exec inside a pooled persistent container, skipping the
+    # per-call create/start/remove cycle entirely. Ask for a structured JSON
+    # report; exit code 4 (usage error) means the plugin is missing, in which
+    # case rerun plain and fall back to stdout heuristics.
+    json_report_command = test_command[:1] + ["--json-report", f"--json-report-file={CONTAINER_JSON_REPORT}"] + test_command[1:]
+    container = None
+    try:
+        container = _acquire_test_container(client)
+        if RUN_TESTS_WARM_WORKER:
+            result = _run_tests_via_worker(container, test_command[1:])
+            if result is not None:
+                _release_test_container(container)
+                print(f"Test execution finished (warm worker). Status: {result['status']}\nOutput:\n{result['output']}")
+                return result
+            print("Warm pytest worker unavailable; running a plain exec instead.")
+        # Pooled containers are reused: clear any report left by a previous
+        # run first, so a crashed pytest (which writes no fresh report) can't
+        # be scored from the prior run's file.
+        container.exec_run(["rm", "-f", CONTAINER_JSON_REPORT])
+        exec_exit_code, output = _exec_streaming(client, container, json_report_command)
+        if exec_exit_code == 4 and "unrecognized arguments" in output:
+            # A plugin flag (--json-report, or -n from xdist) isn't available
+            # in the image; rerun with the bare command.
+            print("pytest plugin flags rejected by test image; rerunning with a plain pytest command.")
+            exec_exit_code, output = _exec_streaming(client, container, ["pytest"] + validated_container_paths)
+            result = None
+        else:
+            result = None
+            cat_exit_code, report_bytes = container.exec_run(["cat", CONTAINER_JSON_REPORT])
+            if cat_exit_code == 0 and report_bytes:
+                result = _parse_json_report(report_bytes.decode('utf-8'), output)
+        _release_test_container(container)
+        if result is not None:
+            print(f"Test execution finished (pooled container, JSON report). Status: {result['status']}\nOutput:\n{output}")
+            return result
+        status = "PASS" if exec_exit_code == 0 else "FAIL"
+        print(f"Test execution finished (pooled container). Status: {status}\nOutput:\n{output}")
+        return _parse_test_output(status, output)
+    except Exception as e:
+        # Fall back to the original one-shot container path.
+        print(f"Pooled test container unavailable ({e}); falling back to a one-shot container.")
+        if container is not None:
+            _discard_test_container(container)
+
     try:
         container = client.containers.run(
             image=TEST_RUNNER_IMAGE,
@@ -387,21 +1594,214 @@ def run_tests(test_paths: list[str]) -> dict:
         # Catch other potential errors during container run
         return {"status": "ERROR", "message": f"An unexpected error occurred running tests in Docker: {e}", "output": ""}
 
-    # --- Basic Output Parsing (Example for pytest) ---
-    # This is a simple example; robust parsing might require specific pytest plugins
-    # (e.g., pytest-json-report) or more complex regex.
-    passed_count = output.count(" passed") # Very basic
-    failed_count = output.count(" failed") # Very basic
-    error_count = output.count(" error")   # Very basic
+    return _parse_test_output(status, output)
 
-    # Refine status based on counts if possible
-    if status == "PASS" and (failed_count > 0 or error_count > 0):
-        status = "FAIL" # Mark as FAIL if tests ran but some failed/errored
 
-    return {
-        "status": status,
-        "passed": passed_count,
-        "failed": failed_count,
-        "errors": error_count,
-        "output": output
-    }
+def run_tests_batch(path_groups: list[list[str]]) -> dict:
+    """
+    Runs several groups of test paths in ONE pytest invocation and splits the
+    results back per group. Prefer this over calling 'run_tests' once per
+    group: interpreter startup and pytest collection are paid once instead of
+    once per group.
+
+    Args:
+        path_groups: A list of groups, each a list of relative paths (strings)
+                     to test files or directories within the project root.
+
+    Returns:
+        A dictionary like 'run_tests' ('status', 'passed', 'failed',
+        'errors', 'output') plus 'groups': a list (parallel to path_groups)
+        of per-group dictionaries with 'paths', 'status' and counts.
+        'groups' is None when the structured JSON report was unavailable and
+        only aggregate counts could be parsed.
+    """
+    if not path_groups or not any(path_groups):
+        return {"status": "ERROR", "message": "No test path groups provided.", "output": ""}
+
+    # Validate every path and record each group's workspace-relative prefixes
+    # for splitting the report by nodeid afterwards.
+    group_prefixes = []
+    all_container_paths = []
+    for group in path_groups:
+        prefixes = []
+        for p in group:
+            safe_host_path = _resolve_safe_path(p)
+            if not safe_host_path:
+                return {"status": "ERROR", "message": f"Invalid or unsafe test path: {p}", "output": ""}
+            relative_path = str(safe_host_path)[_PROJECT_ROOT_PREFIX_LEN:] or "."
+            prefixes.append(relative_path)
+            container_path = _CONTAINER_WORKSPACE_PREFIX + relative_path
+            if container_path not in all_container_paths:
+                all_container_paths.append(container_path)
+        group_prefixes.append(prefixes)
+
+    try:
+        client = _get_docker_client()
+        _ensure_test_image(client)
+    except Exception as e:
+        return {"status": "ERROR", "message": f"Docker client initialization failed: {e}", "output": ""}
+
+    command = ["pytest", "--json-report", f"--json-report-file={CONTAINER_JSON_REPORT}"] + all_container_paths
+    print(f"Running batched tests in Docker. Image: {TEST_RUNNER_IMAGE}, {len(path_groups)} group(s), command: {' '.join(command)}")
+
+    container = None
+    try:
+        container = _acquire_test_container(client)
+        # Clear any report a previous run left in this reused container, so a
+        # crashed pytest can't be scored from the prior run's file.
+        container.exec_run(["rm", "-f", CONTAINER_JSON_REPORT])
+        exec_exit_code, output = _exec_streaming(client, container, command)
+        cat_exit_code, report_bytes = container.exec_run(["cat", CONTAINER_JSON_REPORT])
+        _release_test_container(container)
+    except Exception as e:
+        # One run per batch is the whole point, so degrade to a single
+        # combined run without per-group splitting rather than N runs.
+        print(f"Pooled test container unavailable ({e}); running the batch as one unsplit run.")
+        if container is not None:
+            _discard_test_container(container)
+        combined = run_tests([p for group in path_groups for p in group])
+        combined["groups"] = None
+        return combined
+
+    report = None
+    if cat_exit_code == 0 and report_bytes:
+        try:
+            report = json.loads(report_bytes.decode('utf-8'))
+        except (json.JSONDecodeError, ValueError):
+            report = None
+
+    status = "PASS" if exec_exit_code == 0 else "FAIL"
+    if report is None:
+        result = _parse_test_output(status, output)
+        result["groups"] = None
+        return result
+
+    def _matches(nodeid: str, prefix: str) -> bool:
+        return nodeid == prefix or nodeid.startswith(prefix + "/") or nodeid.startswith(prefix + "::")
+
+    groups = []
+    for group, prefixes in zip(path_groups, group_prefixes):
+        counts = {"passed": 0, "failed": 0, "error": 0}
+        for test in report.get("tests", []):
+            if any(_matches(test.get("nodeid", ""), prefix) for prefix in prefixes):
+                outcome = test.get("outcome")
+                if outcome in counts:
+                    counts[outcome] += 1
+        groups.append({
+            "paths": list(group),
+            "status": "PASS" if counts["failed"] == 0 and counts["error"] == 0 else "FAIL",
+            "passed": counts["passed"],
+            "failed": counts["failed"],
+            "errors": counts["error"],
+        })
+
+    result = _parse_json_report(report_bytes.decode('utf-8'), output) or _parse_test_output(status, output)
+    result["groups"] = groups
+    print(f"Batched test execution finished. Status: {result['status']} across {len(groups)} group(s).")
+    return result
+
+
+# --- Local (containerless) Test Execution ---
+
+# Opt-in escape hatch for trusted, in-repo code: run pytest in a forked,
+# resource-limited child process instead of a Docker container. Saves the
+# whole container round-trip (hundreds of ms per call) at the cost of weaker
+# isolation, so it is disabled unless ALLOW_LOCAL_TESTS=1.
+ALLOW_LOCAL_TESTS = os.environ.get("ALLOW_LOCAL_TESTS") == "1"
+
+# Resource ceilings for the forked test child.
+LOCAL_TESTS_MEMORY_LIMIT = 2 * 1024 * 1024 * 1024 # bytes of address space
+LOCAL_TESTS_CPU_SECONDS = 300
+
+
+def run_tests_local(test_paths: list[str]) -> dict:
+    """
+    Runs tests with pytest in a forked, resource-limited local process,
+    skipping Docker entirely. Only for trusted in-repo code; requires the
+    ALLOW_LOCAL_TESTS=1 environment variable and a platform with os.fork.
+
+    Args:
+        test_paths: A list of relative paths (strings) to the test files or
+                    directories within the project root.
+
+    Returns:
+        The same result dictionary shape as 'run_tests': 'status' ('PASS',
+        'FAIL', or 'ERROR'), 'output', and parsed counts where available.
+    """
+    if not ALLOW_LOCAL_TESTS:
+        return {"status": "ERROR", "message": "Local test execution is disabled (set ALLOW_LOCAL_TESTS=1); use run_tests instead.", "output": ""}
+    if not hasattr(os, "fork"):
+        return {"status": "ERROR", "message": "Local test execution requires os.fork (POSIX only); use run_tests instead.", "output": ""}
+    if not test_paths:
+        return {"status": "ERROR", "message": "No test paths provided.", "output": ""}
+
+    validated_paths = []
+    for p in test_paths:
+        safe_host_path = _resolve_safe_path(p)
+        if not safe_host_path:
+            return {"status": "ERROR", "message": f"Invalid or unsafe test path: {p}", "output": ""}
+        validated_paths.append(str(safe_host_path)[_PROJECT_ROOT_PREFIX_LEN:] or ".")
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: cap resources, run pytest in-process, ship captured output
+        # back through the pipe, and _exit so no parent atexit handlers
+        # (e.g. the container-pool teardown) run twice.
+        exit_code = 1
+        try:
+            os.close(read_fd)
+            import contextlib
+            import io
+            import resource
+
+            import pytest
+
+            resource.setrlimit(resource.RLIMIT_AS, (LOCAL_TESTS_MEMORY_LIMIT, LOCAL_TESTS_MEMORY_LIMIT))
+            resource.setrlimit(resource.RLIMIT_CPU, (LOCAL_TESTS_CPU_SECONDS, LOCAL_TESTS_CPU_SECONDS))
+            os.chdir(PROJECT_ROOT)
+
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+                exit_code = int(pytest.main(validated_paths + ["-p", "no:cacheprovider"]))
+            payload = json.dumps({"exitcode": exit_code, "output": buffer.getvalue()})
+            os.write(write_fd, payload.encode("utf-8"))
+            os.close(write_fd)
+        except BaseException:
+            pass # The parent treats a missing payload as an error
+        finally:
+            os._exit(exit_code)
+
+    # Parent: read the child's JSON payload, then reap it.
+    os.close(write_fd)
+    chunks = []
+    while True:
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    try:
+        payload = json.loads(b"".join(chunks).decode("utf-8"))
+    except (json.JSONDecodeError, ValueError):
+        return {"status": "ERROR", "message": "Local test child produced no result (crashed or hit a resource limit).", "output": ""}
+
+    output = payload.get("output", "")
+    status = "PASS" if payload.get("exitcode") == 0 else "FAIL"
+    print(f"Test execution finished (local fork). Status: {status}\nOutput:\n{output}")
+    return _parse_test_output(status, output)
+
+
+# --- Shared Tool Registries ---
+
+# Canonical, immutable tool groupings shared across the agents. Each agent
+# references one of these tuples instead of building its own list, so the
+# same tool objects (and their derived schemas) are reused everywhere.
+EXPLORE_TOOLS = (read_file, read_file_async, read_files_async, scan_codebase)
+REVIEW_TOOLS = (read_files, read_files_bundle, static_analysis)
+WRITE_TOOLS = (write_file, write_file_async, copy_file, read_file, read_file_async)
+# run_tests_local is only exposed when the operator has opted in.
+TEST_TOOLS = (read_file, read_files, write_file, write_files, run_tests, run_tests_batch) + ((run_tests_local,) if ALLOW_LOCAL_TESTS else ())
+GIT_TOOLS = (git_commit_all, git_init, git_add, git_commit, agit_init, agit_add, agit_commit)
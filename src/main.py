@@ -1,11 +1,19 @@
 import asyncio
-import asyncio
 import argparse
+import inspect
+import logging
 import os
 import json
 import pathlib # Added import
 from dotenv import load_dotenv
 
+# Optional: fast C JSON serializer for the event-printing loop. Falls back to
+# the stdlib when not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 
@@ -23,6 +31,20 @@ except ImportError as e:
     exit(1)
 
 
+def _dump(obj) -> str:
+    """
+    Pretty-prints an object as indented JSON, via orjson when available
+    (3-10x faster than the pure-Python json module with indent/default)
+    and the stdlib otherwise. Non-serializable values degrade to str().
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+    return json.dumps(obj, indent=2, default=str)
+
+
+logger = logging.getLogger(__name__)
+
+
 async def main():
     """
     Main execution function to run the requirement implementation workflow.
@@ -55,7 +77,8 @@ async def main():
         if not req_path.is_file():
              print(f"Error: Requirement file not found or is not a file: {requirement_file_path}")
              exit(1)
-        user_requirement_text = req_path.read_text(encoding='utf-8')
+        # Off-thread read: keeps the (already running) event loop free
+        user_requirement_text = await asyncio.to_thread(req_path.read_text, encoding='utf-8')
         print(f"Successfully read requirement from: {requirement_file_path}")
     except FileNotFoundError:
         print(f"Error: Requirement file not found: {requirement_file_path}")
@@ -67,6 +90,12 @@ async def main():
         print(f"Error reading requirement file '{requirement_file_path}': {e}")
         exit(1)
 
+    # --- Logging Setup ---
+    # INFO shows workflow progress banners; DEBUG additionally enables the
+    # orchestrator's truncated state previews and full event dumps. At INFO,
+    # the debug-level formatting work is skipped entirely.
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(levelname)s %(name)s: %(message)s")
+
     # --- Environment Setup ---
     # Load environment variables from .env file (especially API keys)
     if load_dotenv():
@@ -98,7 +127,12 @@ async def main():
 
     # --- Session Creation ---
     print("Creating new session...")
-    session = await session_service.create_session(initial_state=initial_state)
+    # Session services may expose sync or async APIs; call the sync form
+    # directly when possible to skip a needless coroutine trampoline.
+    if inspect.iscoroutinefunction(session_service.create_session):
+        session = await session_service.create_session(initial_state=initial_state)
+    else:
+        session = session_service.create_session(initial_state=initial_state)
     print(f"Session created with ID: {session.session_id}")
     print(f"Initial Session State: {initial_state}")
 
@@ -107,19 +141,19 @@ async def main():
     try:
         # Pass the requirement text itself in the query, not the path
         async for event in runner.run_async(session_id=session.session_id, query=user_requirement_text):
-            # Print events for observation during execution
-            # You might want to filter or format specific event types
-            print(f"\n--- Event Received ---")
-            print(f"Type: {type(event).__name__}")
-            # Pretty print the event dictionary if it has one
-            # Use model_dump_json for Pydantic v2+
-            if hasattr(event, 'model_dump_json'):
-                 print(event.model_dump_json(indent=2))
-            elif hasattr(event, 'dict'): # Fallback for older Pydantic or other dict-like objects
-                 print(json.dumps(event.dict(), indent=2, default=str))
-            else:
-                 print(event)
-            print("----------------------")
+            # Log events for observation during execution. One INFO line per
+            # event; the full JSON dump (serialization included) only happens
+            # when DEBUG is enabled, so high-rate event streams don't pay for
+            # formatting and stdout flushes that nobody reads.
+            logger.info("Event received: %s", type(event).__name__)
+            if logger.isEnabledFor(logging.DEBUG):
+                # Use model_dump for Pydantic v2+; dict() for older Pydantic
+                if hasattr(event, 'model_dump'):
+                    logger.debug("%s", _dump(event.model_dump()))
+                elif hasattr(event, 'dict'):
+                    logger.debug("%s", _dump(event.dict()))
+                else:
+                    logger.debug("%s", event)
 
     except Exception as e:
         print(f"\n!!! An error occurred during agent execution: {e} !!!")
@@ -129,10 +163,13 @@ async def main():
         # --- Final State Retrieval ---
         print("\n>>> Agent Execution Finished <<<")
         try:
-            final_session = await session_service.get_session(session.session_id)
+            if inspect.iscoroutinefunction(session_service.get_session):
+                final_session = await session_service.get_session(session.session_id)
+            else:
+                final_session = session_service.get_session(session.session_id)
             print("\n--- Final Session State ---")
-            # Use default=str to handle non-serializable types like Path objects if they end up in state
-            print(json.dumps(final_session.state, indent=2, default=str))
+            # default=str handles non-serializable types like Path objects if they end up in state
+            print(_dump(final_session.state))
             print("-------------------------")
         except Exception as e:
             print(f"Error retrieving final session state: {e}")
@@ -0,0 +1,36 @@
+import functools
+import pathlib
+import shutil
+import sys
+
+import pytest
+
+# Make src/ importable once for the whole test session, instead of each test
+# module mutating sys.path at import time. Guarded so repeated conftest
+# imports (e.g. under xdist workers) never stack duplicate entries.
+SRC_DIR = pathlib.Path(__file__).parent.parent.resolve() / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "docker: test requires the Docker CLI and a running daemon"
+    )
+
+
+@functools.cache
+def _has_docker() -> bool:
+    """PATH lookup for the Docker CLI, cached so reloads and repeat callers
+    (watch-mode reruns, other fixtures) never pay for the scan again."""
+    return shutil.which("docker") is not None
+
+
+def pytest_collection_modifyitems(config, items):
+    # One PATH lookup per session decides the fate of every docker-marked
+    # test, instead of each test carrying its own skipif evaluation.
+    if not _has_docker():
+        skip_docker = pytest.mark.skip(reason="Docker executable not found in PATH")
+        for item in items:
+            if "docker" in item.keywords:
+                item.add_marker(skip_docker)
@@ -1,52 +1,44 @@
+import functools
 import pytest
 import pathlib
-import shutil
 import json
 import os
-import sys
-
-# Add src directory to sys.path to allow importing custom_tools
-# This assumes tests are run from the project root directory
-PROJECT_ROOT_TEST = pathlib.Path(__file__).parent.parent.resolve()
-SRC_DIR = PROJECT_ROOT_TEST / "src"
-sys.path.insert(0, str(SRC_DIR))
-
-# Now import the functions from custom_tools
-# Also import the PROJECT_ROOT defined there for consistency in tests
+import shutil
+import subprocess
+import time
+
+# src/ is put on sys.path once by tests/conftest.py.
+# Now import the functions from custom_tools. The Docker-facing symbols
+# (run_tests, TEST_RUNNER_IMAGE) are imported inside the docker-marked tests
+# instead, so non-Docker runs don't depend on them by name; sys.modules makes
+# those local imports O(1) dict hits after the first.
+import custom_tools
 from custom_tools import (
     read_file,
     write_file,
     list_directory,
-    run_tests,
-    PROJECT_ROOT, # Import the PROJECT_ROOT from the module
-    TEST_RUNNER_IMAGE # Import for potential use/checking
 )
 
-# Define paths relative to the PROJECT_ROOT from custom_tools
+# Path names used throughout; the Path objects themselves are bound by the
+# session fixture below once the temporary project root exists.
 TEST_DIR_NAME = "temp_test_data"
-TEST_DIR = PROJECT_ROOT / TEST_DIR_NAME
 TEST_FILE_NAME = "test_file.txt"
-TEST_FILE = TEST_DIR / TEST_FILE_NAME
 NESTED_DIR_NAME = "nested_dir"
-NESTED_DIR = TEST_DIR / NESTED_DIR_NAME
 NESTED_FILE_NAME = "nested_file.txt"
-NESTED_FILE = NESTED_DIR / NESTED_FILE_NAME
 DUMMY_PYTEST_FILE_NAME = "test_dummy_sample.py"
-DUMMY_PYTEST_FILE = TEST_DIR / DUMMY_PYTEST_FILE_NAME
-
-# --- Test Fixture ---
 
-@pytest.fixture(scope="module", autouse=True)
-def test_environment():
-    """Sets up and tears down the test directory and files."""
-    # Setup: Create test directory and files
-    TEST_DIR.mkdir(exist_ok=True)
-    NESTED_DIR.mkdir(exist_ok=True)
-    TEST_FILE.write_text("Hello Test", encoding='utf-8')
-    NESTED_FILE.write_text("Hello Nested Test", encoding='utf-8')
-
-    # Dummy pytest file content
-    dummy_test_content = """
+PROJECT_ROOT = None
+TEST_DIR = None
+TEST_FILE = None
+NESTED_DIR = None
+NESTED_FILE = None
+DUMMY_PYTEST_FILE = None
+
+# Fixture file contents as bytes constants: write_bytes skips the per-call
+# UTF-8 encode that write_text performs.
+_TEST_FILE_CONTENT = b"Hello Test"
+_NESTED_FILE_CONTENT = b"Hello Nested Test"
+_DUMMY_PYTEST_CONTENT = b"""
 import pytest
 
 def test_success():
@@ -56,15 +48,67 @@ def test_success():
 # def test_failure():
 #    assert False
 """
-    DUMMY_PYTEST_FILE.write_text(dummy_test_content, encoding='utf-8')
 
-    yield # Tests run here
+# --- Test Fixture ---
 
-    # Teardown: Remove the test directory and its contents
-    if TEST_DIR.exists():
-        shutil.rmtree(TEST_DIR)
+@pytest.fixture(scope="session")
+def worker_id(request):
+    """
+    The pytest-xdist worker id, or 'master' when running without xdist.
+    Defined here so the suite does not depend on the plugin being installed.
+    """
+    workerinput = getattr(request.config, "workerinput", None)
+    return workerinput["workerid"] if workerinput else "master"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def test_environment(tmp_path_factory, worker_id):
+    """
+    Builds the test tree under pytest's managed tmp root and points
+    custom_tools at it, so test runs never touch the real working tree and
+    cleanup is handled by pytest's tmp retention policy instead of rmtree.
+    The root is keyed by xdist worker id, so parallel workers (and their
+    Docker bind mounts for run_tests) never share a directory.
+    """
+    root = tmp_path_factory.mktemp(f"proj_{worker_id}")
+
+    global PROJECT_ROOT, TEST_DIR, TEST_FILE, NESTED_DIR, NESTED_FILE, DUMMY_PYTEST_FILE
+    PROJECT_ROOT = root
+    TEST_DIR = root / TEST_DIR_NAME
+    TEST_FILE = TEST_DIR / TEST_FILE_NAME
+    NESTED_DIR = TEST_DIR / NESTED_DIR_NAME
+    NESTED_FILE = NESTED_DIR / NESTED_FILE_NAME
+    DUMMY_PYTEST_FILE = TEST_DIR / DUMMY_PYTEST_FILE_NAME
+
+    # Setup: one mkdir for the deepest path creates the whole tree, then the
+    # precomputed bytes go straight to disk.
+    NESTED_DIR.mkdir(parents=True, exist_ok=True)
+    TEST_FILE.write_bytes(_TEST_FILE_CONTENT)
+    NESTED_FILE.write_bytes(_NESTED_FILE_CONTENT)
+    DUMMY_PYTEST_FILE.write_bytes(_DUMMY_PYTEST_CONTENT)
+    # Present so listing the project root still shows the usual layout
+    (root / "src").mkdir()
+    (root / "tests").mkdir()
+
+    # custom_tools derives its root constants (and caches path resolutions)
+    # at import time; patch them together for the session and drop the caches
+    # so every tool resolves against the temporary root. MonkeyPatch.context
+    # stands in for the function-scoped monkeypatch fixture at session scope.
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(custom_tools, "PROJECT_ROOT", root)
+        mp.setattr(custom_tools, "_PROJECT_ROOT_STR", str(root))
+        mp.setattr(custom_tools, "_PROJECT_ROOT_PREFIX", str(root) + os.sep)
+        mp.setattr(custom_tools, "_PROJECT_ROOT_PREFIX_LEN", len(str(root) + os.sep))
+        custom_tools._resolve_safe_path.cache_clear()
+
+        yield # Tests run here
+
+        custom_tools._resolve_safe_path.cache_clear()
 
 # --- Helper to get relative path string ---
+# Cached: the same handful of fixture paths are converted over and over across
+# tests, and the project root is fixed for the whole session.
+@functools.lru_cache(maxsize=None)
 def relative_path_str(path_obj: pathlib.Path) -> str:
     """Returns the path relative to PROJECT_ROOT as a string."""
     return str(path_obj.relative_to(PROJECT_ROOT))
@@ -87,16 +131,29 @@ def test_read_file_is_directory():
     result = read_file(TEST_DIR_NAME) # Try reading the directory itself
     assert "Error: File not found at resolved path" in result # is_file() check fails
 
-def test_read_file_unsafe_path_traversal():
-    result = read_file("../some_other_file.txt") # Attempt traversal
-    assert "Error: Invalid or unsafe path specified" in result
-
-def test_read_file_unsafe_path_absolute(tmp_path):
+def test_read_file_unsafe_path_absolute(tmp_path, capsys):
     # Create a temporary file outside the project root
     outside_file = tmp_path / "outside.txt"
-    outside_file.write_text("outside content")
+    outside_file.write_bytes(b"outside content")
     result = read_file(str(outside_file.resolve())) # Use absolute path
-    assert "Error: Absolute paths are not allowed" in result
+    # Tools return the uniform rejection; the specific reason is printed as a
+    # diagnostic by _resolve_safe_path.
+    assert "Error: Invalid or unsafe path specified" in result
+    assert "Absolute paths are not allowed" in capsys.readouterr().out
+
+def test_read_file_rejects_symlink_escape(tmp_path):
+    # A relative path with no '..' segments can still escape the project via
+    # an intermediate symlink; the realpath-based resolution must catch it.
+    target = tmp_path / "outside.txt"
+    target.write_bytes(b"outside content")
+    link = TEST_DIR / "escape_link"
+    link.symlink_to(target)
+    try:
+        result = read_file(f"{TEST_DIR_NAME}/escape_link")
+        assert "unsafe" in result.lower()
+    finally:
+        # Remove the link so the listing tests see the fixture layout
+        link.unlink()
 
 # --- Tests for write_file ---
 
@@ -104,7 +161,9 @@ def test_write_file_success_new():
     new_file_rel_path = f"{TEST_DIR_NAME}/new_write_file.txt"
     result = write_file(new_file_rel_path, "New content here")
     assert result["status"] == "success"
-    assert (PROJECT_ROOT / new_file_rel_path).read_text(encoding='utf-8') == "New content here"
+    assert (PROJECT_ROOT / new_file_rel_path).read_bytes() == b"New content here"
+    # Remove the file so the directory-listing tests see the fixture layout
+    (PROJECT_ROOT / new_file_rel_path).unlink()
 
 def test_write_file_success_overwrite():
     # First write
@@ -112,63 +171,86 @@ def test_write_file_success_overwrite():
     # Then overwrite
     result = write_file(relative_path_str(TEST_FILE), "Overwritten content", overwrite=True)
     assert result["status"] == "success"
-    assert TEST_FILE.read_text(encoding='utf-8') == "Overwritten content"
+    assert TEST_FILE.read_bytes() == b"Overwritten content"
 
 def test_write_file_fail_exists_no_overwrite():
     result = write_file(relative_path_str(TEST_FILE), "Attempt to overwrite", overwrite=False)
     assert result["status"] == "failure"
     assert "File already exists" in result["message"]
     # Ensure content wasn't overwritten
-    assert TEST_FILE.read_text(encoding='utf-8') != "Attempt to overwrite"
+    assert TEST_FILE.read_bytes() != b"Attempt to overwrite"
 
 def test_write_file_fail_is_directory():
     result = write_file(TEST_DIR_NAME, "Trying to write to dir")
     assert result["status"] == "failure"
     assert "Path points to a directory" in result["message"]
 
-def test_write_file_unsafe_path_traversal():
-    result = write_file("../unsafe_write.txt", "unsafe content")
-    assert result["status"] == "failure"
-    assert "Invalid or unsafe path specified" in result["message"]
-
-def test_write_file_unsafe_path_absolute(tmp_path):
+def test_write_file_unsafe_path_absolute(tmp_path, capsys):
     outside_file = tmp_path / "outside_write.txt"
     result = write_file(str(outside_file.resolve()), "outside content")
     assert result["status"] == "failure"
-    assert "Absolute paths are not allowed" in result["message"]
+    # As above: uniform rejection in the result, specific reason on stdout.
+    assert "Invalid or unsafe path specified" in result["message"]
+    assert "Absolute paths are not allowed" in capsys.readouterr().out
 
 # --- Tests for list_directory ---
 
-def test_list_directory_success_non_recursive():
-    # List contents of TEST_DIR_NAME
-    result = list_directory(TEST_DIR_NAME)
-    assert isinstance(result, list)
-    # Use sets for order-independent comparison
-    expected = {TEST_FILE_NAME, NESTED_DIR_NAME, DUMMY_PYTEST_FILE_NAME}
-    # Get actual file names present in the test directory
-    actual_files = {item.name for item in TEST_DIR.iterdir()}
-    assert actual_files == expected
-
-
-def test_list_directory_success_recursive():
-    result = list_directory(TEST_DIR_NAME, recursive=True)
+# Both flavors share the fixture layout and differ only in the flag and the
+# expected set; parametrizing keeps one test body and one collection entry
+# per case. Expected paths use native separators (list_directory emits
+# os.path.relpath output), so the sets compare directly without normalizing.
+@pytest.mark.parametrize("recursive,expected", [
+    pytest.param(
+        False,
+        {TEST_FILE_NAME, NESTED_DIR_NAME, DUMMY_PYTEST_FILE_NAME},
+        id="non_recursive",
+    ),
+    pytest.param(
+        True,
+        {
+            TEST_FILE_NAME,
+            NESTED_DIR_NAME,
+            f"{NESTED_DIR_NAME}{os.sep}{NESTED_FILE_NAME}",
+            DUMMY_PYTEST_FILE_NAME,
+        },
+        id="recursive",
+    ),
+])
+def test_list_directory_success(recursive, expected):
+    result = list_directory(TEST_DIR_NAME, recursive=recursive)
     assert isinstance(result, list)
-    # Expected paths relative to TEST_DIR_NAME
-    expected = {
-        TEST_FILE_NAME,
-        NESTED_DIR_NAME,
-        os.path.join(NESTED_DIR_NAME, NESTED_FILE_NAME), # Use os.path.join for cross-platform compatibility
-        DUMMY_PYTEST_FILE_NAME
-    }
-    # Convert result paths to use os specific separators for comparison
-    result_paths_set = {os.path.normpath(p) for p in result}
-    expected_paths_set = {os.path.normpath(p) for p in expected}
-    assert result_paths_set == expected_paths_set
+    # Use sets for order-independent comparison; assert on the function's own
+    # result rather than re-scanning the directory.
+    assert set(result) == expected
+
+
+def test_list_directory_deep_recursive():
+    # Guards against a regression to recursive per-level path rebuilding:
+    # list_directory's iterative scandir walk should handle a deep chain in
+    # well under the (very generous) wall-clock bound.
+    depth = 8
+    # Created through write_file: it builds the parent chain itself and
+    # invalidates list_directory's short-TTL memo, so the listing below is a
+    # real walk rather than a cached result.
+    leaf_rel_path = "/".join([TEST_DIR_NAME] + ["deep"] * depth + ["leaf.txt"])
+    assert write_file(leaf_rel_path, "leaf")["status"] == "success"
+    try:
+        start = time.monotonic()
+        result = list_directory(TEST_DIR_NAME, recursive=True)
+        elapsed = time.monotonic() - start
+        assert isinstance(result, list)
+        leaf_rel = os.sep.join(["deep"] * depth + ["leaf.txt"])
+        assert leaf_rel in result
+        assert elapsed < 0.1, f"recursive listing took {elapsed:.3f}s"
+    finally:
+        # Remove the chain so the other listing tests see the fixture layout
+        shutil.rmtree(TEST_DIR / "deep")
 
 
 def test_list_directory_default_path_non_recursive():
-    # This lists the PROJECT_ROOT. Be careful if many files exist there.
-    # We know 'src' and 'tests' should be there.
+    # Lists the session's synthesized tmp project root (src/, tests/ and the
+    # fixture dir), so the test stays constant-time no matter how large the
+    # real repository grows.
     result = list_directory(".") # Default path is '.'
     assert isinstance(result, list)
     assert "src" in result
@@ -181,30 +263,61 @@ def test_list_directory_fail_not_directory():
     assert result["status"] == "failure"
     assert "Path is not a directory" in result["message"]
 
-def test_list_directory_fail_unsafe_path():
-    result = list_directory("../")
-    assert isinstance(result, dict)
-    assert result["status"] == "failure"
-    assert "Invalid or unsafe path specified" in result["message"]
-
 def test_list_directory_fail_non_existent():
     result = list_directory("non_existent_dir_abc")
     assert isinstance(result, dict)
     assert result["status"] == "failure"
     assert "Path is not a directory" in result["message"] # Fails is_dir() check
 
+# --- Shared path-safety tests ---
+
+# All three tools funnel '../' paths through the same _resolve_safe_path
+# rejection; one parametrized test covers them without three separate
+# setup/report frames.
+@pytest.mark.parametrize(
+    "tool,extract",
+    [
+        pytest.param(read_file, lambda r: r, id="read_file"),
+        pytest.param(lambda p: write_file(p, "unsafe content"), lambda r: r["message"], id="write_file"),
+        pytest.param(list_directory, lambda r: r["message"], id="list_directory"),
+    ],
+)
+def test_unsafe_path_traversal_rejected(tool, extract):
+    result = tool("../unsafe_target")
+    assert "Invalid or unsafe path specified" in extract(result)
+
 # --- Tests for run_tests ---
 # These tests require Docker to be running and the TEST_RUNNER_IMAGE
 # (e.g., python:3.11-slim with pytest installed) to be available.
 
-# Mark tests that require docker
-requires_docker = pytest.mark.skipif(
-    shutil.which("docker") is None, reason="Docker executable not found in PATH"
-)
+# Mark tests that require docker. The skip decision is made once per session
+# by the collection hook in conftest.py.
+requires_docker = pytest.mark.docker
+
+
+@pytest.fixture(scope="session")
+def _warm_test_image():
+    """
+    Ensures TEST_RUNNER_IMAGE is present before the requesting test runs, so
+    a cold first pull lands in fixture setup instead of inflating the timing
+    of the Docker-backed test itself. Requested only by the tests that
+    actually start a container - deliberately not autouse, so selecting a
+    docker-free subset (e.g. -k 'not docker') never triggers a pull.
+    """
+    if shutil.which("docker") is None:
+        return
+    from custom_tools import TEST_RUNNER_IMAGE
+    inspect = subprocess.run(
+        ["docker", "image", "inspect", TEST_RUNNER_IMAGE],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    if inspect.returncode != 0:
+        subprocess.run(["docker", "pull", TEST_RUNNER_IMAGE], check=False)
 
 @requires_docker
-def test_run_tests_success():
+def test_run_tests_success(_warm_test_image):
     """Tests running a simple passing pytest file."""
+    from custom_tools import run_tests
     test_file_rel_path = relative_path_str(DUMMY_PYTEST_FILE)
     result = run_tests([test_file_rel_path])
 
@@ -232,18 +345,21 @@ def test_run_tests_success():
 
 @requires_docker
 def test_run_tests_fail_no_paths():
+    from custom_tools import run_tests
     result = run_tests([])
     assert result["status"] == "ERROR"
     assert "No test paths provided" in result["message"]
 
 @requires_docker
 def test_run_tests_fail_unsafe_path():
+    from custom_tools import run_tests
     result = run_tests(["../unsafe_test.py"])
     assert result["status"] == "ERROR"
     assert "Invalid or unsafe test path" in result["message"]
 
 @requires_docker
 def test_run_tests_fail_non_existent_path():
+    from custom_tools import run_tests
     result = run_tests(["non_existent_test_file.py"])
     # This should fail at path validation before Docker is involved
     assert result["status"] == "ERROR"